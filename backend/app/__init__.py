@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
@@ -7,8 +7,10 @@ from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 import os
 
+from app.utils.replicas import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
 
@@ -17,20 +19,45 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object("app.config.Config")
 
-    CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "http://localhost:5173"}})
+    # orjson-backed when available; models hand raw values to it
+    from app.utils.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    CORS(app, supports_credentials=True, expose_headers=["X-Next-Cursor", "Link"],
+         resources={r"/api/*": {"origins": "http://localhost:5173"}})
 
+    # Pool settings and SQLite pragmas from DB_ENGINE_PROFILE
+    from app.utils.engine import apply_profile, install_pragmas
+    apply_profile(app)
     db.init_app(app)
+    with app.app_context():
+        install_pragmas(app, db.engine)
+
+    # Read replicas for @read_replica handlers
+    from app.utils import replicas
+    replicas.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
     Migrate(app, db)
 
-    #     # Configure JWT token revocation check
-    # @jwt.token_in_blocklist_loader
-    # def check_if_token_revoked(jwt_header, jwt_payload):
-    #     # Import here to avoid circular imports
-    #     from app.utils.auth import is_token_revoked
-    #     return is_token_revoked(jwt_payload["jti"])
-    
+    from app.utils.latency import request_timer
+    request_timer.init_app(app)
+
+    # Login spikes: back off instead of queueing behind the hashing pool
+    from app.utils.passwords import HasherBusy
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(e):
+        return jsonify({"error": "Too many sign-ins right now, please retry shortly"}), 503, \
+            {"Retry-After": str(e.retry_after)}
+
+    # Configure JWT token revocation check
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        # Import here to avoid circular imports
+        from app.utils.auth import is_token_revoked
+        return is_token_revoked(jwt_payload)
+
     # # JWT error handlers
     # @jwt.expired_token_loader
     # def expired_token_callback(jwt_header, jwt_payload):
@@ -49,8 +76,9 @@ def create_app():
     from app.routes.event_routes import bp as event_bp
     from app.routes.dashboard_routes import bp as dashboard_bp
     from app.routes.donor_routes import bp as donor_routes_bp
-    print("✅ Registering dashboard blueprint")
-    
+    from app.routes.search_routes import bp as search_bp
+    from app.routes.analytics_routes import bp as analytics_bp
+
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(orphan_bp, url_prefix='/api/orphans')
     app.register_blueprint(volunteer_bp, url_prefix='/api/volunteers')
@@ -59,6 +87,14 @@ def create_app():
     app.register_blueprint(event_bp, url_prefix='/api/events')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(donor_routes_bp, url_prefix='/api/donors')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+
+    # Keeps stats_counters in step with every flush
+    from app.utils import stats  # noqa: F401
+
+    from app.commands import register_commands
+    register_commands(app)
 
     return app
 
@@ -0,0 +1,121 @@
+import sys
+from io import BytesIO
+
+from a2wsgi import WSGIMiddleware
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from app.utils import async_db
+
+
+def create_asgi_app():
+    """The app for an ASGI server, e.g. ``uvicorn asgi:app`` (see backend/asgi.py)."""
+    app = create_app()
+    async_db.init_app(app)
+    return ASGIApp(app)
+
+
+class ASGIApp:
+    """The Flask app behind an ASGI interface.
+
+    GETs whose endpoint has an async twin (``async_db.async_route``) are
+    answered on the event loop. Everything else, writes included, goes to the
+    WSGI app on a pool of ASGI_SYNC_THREADS threads per worker, exactly as
+    under a threaded WSGI server. Both paths match URLs with the same
+    blueprints and run the same before/after request hooks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WSGIMiddleware(app, workers=app.config['ASGI_SYNC_THREADS'])
+        self.views = async_db.ASYNC_VIEWS if app.config['ASGI_ASYNC_VIEWS'] else {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and self.views:
+            environ = _environ(scope)
+            view = self._match(environ)
+            if view is not None:
+                return await self._dispatch(view, environ, send)
+        await self.wsgi(scope, receive, send)
+
+    def _match(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:  # 404s, 405s and slash redirects are left to Flask
+            return None
+        return self.views.get(endpoint)
+
+    async def _dispatch(self, entry, environ, send):
+        # Flask's full_dispatch_request, awaiting the view
+        view, replica_tables = entry
+        app = self.app
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        async with async_db.request_session(replica_tables) as session:
+                            rv = await view(session, **request.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            await _send(response, environ, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose(self.app)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _environ(scope):
+    # A body-less WSGI environ for a GET/HEAD, enough for Flask's request context
+    root_path = scope.get('root_path', '')
+    path = scope['path'][len(root_path):] if scope['path'].startswith(root_path) else scope['path']
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _send(response, environ, send):
+    # Werkzeug drops the body of HEADs and 304s and fixes up the headers
+    headers = response.get_wsgi_headers(environ)
+    body = b''.join(response.get_app_iter(environ))
+    response.close()
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.to_wsgi_list()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
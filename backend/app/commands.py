@@ -0,0 +1,169 @@
+import click
+from flask.cli import AppGroup
+
+from app import db
+
+stats_cli = AppGroup('stats', help='Dashboard counter maintenance.')
+
+
+@stats_cli.command('rebuild')
+@click.option('--dry-run', is_flag=True, help='Only report drift, do not rewrite the counters.')
+def rebuild_stats(dry_run):
+    """Recount stats_counters from the source tables and report any drift."""
+    from app.utils.stats import rebuild_counters
+
+    drift = rebuild_counters(db.session, dry_run=dry_run)
+    for key, (have_count, have_amount), (want_count, want_amount) in drift:
+        click.echo(f'{key}: count {have_count} -> {want_count}, amount {have_amount:g} -> {want_amount:g}')
+    click.echo(f'{len(drift)} counter(s) drifted' + ('' if dry_run else ', counters rebuilt'))
+
+
+@click.command('import')
+@click.argument('resource', type=click.Choice(['orphans', 'volunteers', 'inventory']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to csv for *.csv files, ndjson otherwise.')
+@click.option('--batch-size', type=int, help='Rows per insert/commit (IMPORT_BATCH_SIZE).')
+def import_records(resource, path, fmt, batch_size):
+    """Bulk import RESOURCE records from a CSV or NDJSON file."""
+    from app.utils.bulk_import import SPECS, import_rows, parse_rows
+
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, 'rb') as stream:
+        report = import_rows(SPECS[resource], parse_rows(stream, fmt), batch_size=batch_size)
+
+    for error in report.errors:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f'{report.inserted} inserted, {report.failed} failed')
+
+
+search_cli = AppGroup('search', help='Full-text search index.')
+
+
+@search_cli.command('rebuild')
+def rebuild_search():
+    """Re-create search_index from the orphan, volunteer, donation and event tables."""
+    from app.utils.search import rebuild_index, supported
+
+    connection = db.session.connection()
+    if not supported(connection):
+        raise click.ClickException(f'Search is not available on {connection.dialect.name}')
+    count = rebuild_index(connection)
+    db.session.commit()
+    click.echo(f'{count} document(s) indexed')
+
+
+analytics_cli = AppGroup('analytics', help='Donation analytics rollups.')
+
+
+@analytics_cli.command('rebuild')
+def rebuild_analytics():
+    """Recompute donation_rollups from the donations table."""
+    from app.utils.analytics import rebuild_rollups
+
+    try:
+        count = rebuild_rollups(db.session)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{count} rollup row(s) written')
+
+
+cache_cli = AppGroup('cache', help='GET response cache.')
+
+
+@cache_cli.command('stats')
+def cache_stats():
+    """Show response cache size and hit/miss/eviction counters."""
+    from app.utils.response_cache import get_cache
+
+    cache = get_cache()
+    if cache is None:
+        click.echo('Response cache is disabled (RESPONSE_CACHE=none)')
+        return
+    for name, value in cache.info().items():
+        click.echo(f'{name}: {value}')
+
+
+@cache_cli.command('clear')
+def cache_clear():
+    """Drop every cached response."""
+    from app.utils.response_cache import get_cache
+
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+    click.echo('Response cache cleared')
+
+
+passwords_cli = AppGroup('passwords', help='Password hashing cost.')
+
+
+@passwords_cli.command('calibrate')
+@click.option('--budget-ms', type=float, default=250, show_default=True, help='CPU time one hash may take.')
+def calibrate_passwords(budget_ms):
+    """Time bcrypt on this host and suggest BCRYPT_LOG_ROUNDS for a per-login budget."""
+    from app.utils.passwords import calibrate
+
+    rounds, timings = calibrate(budget_ms)
+    for cost, ms in timings.items():
+        click.echo(f'cost {cost}: {ms:.1f} ms')
+    click.echo(f'BCRYPT_LOG_ROUNDS={rounds} fits {budget_ms:g} ms')
+
+
+@passwords_cli.command('costs')
+def password_costs():
+    """Count accounts per stored hash cost; others than BCRYPT_LOG_ROUNDS are redone at login."""
+    from collections import Counter
+    from flask import current_app
+    from sqlalchemy import select
+    from app.models import Donor, User
+    from app.utils.passwords import hash_cost
+
+    target = current_app.config['BCRYPT_LOG_ROUNDS']
+    for model in (User, Donor):
+        costs = Counter(hash_cost(pw_hash) for pw_hash in db.session.execute(select(model.password_hash)).scalars())
+        for cost, count in sorted(costs.items()):
+            click.echo(f"{model.__tablename__}: cost {cost}: {count}" + ('' if cost == target else ' (pending rehash)'))
+
+
+tokens_cli = AppGroup('tokens', help='Revoked JWTs and login device keys.')
+
+
+@tokens_cli.command('prune')
+def prune_tokens():
+    """Delete revocations of tokens that have expired anyway, and expired device keys."""
+    from app.utils.passwords import prune_device_keys
+    from app.utils.revocation import prune
+
+    click.echo(f'{prune(db.session)} expired revocation(s) removed')
+    removed = prune_device_keys(db.session)
+    db.session.commit()
+    click.echo(f'{removed} expired device key(s) removed')
+
+
+replicas_cli = AppGroup('replicas', help='Read replicas.')
+
+
+@replicas_cli.command('sync')
+def sync_replicas():
+    """Copy the primary SQLite database to the SQLite replicas (local testing)."""
+    from flask import current_app
+    from app.utils.replicas import sync_sqlite_replicas
+
+    try:
+        paths = sync_sqlite_replicas(current_app)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for path in paths:
+        click.echo(f'synced {path}')
+
+
+def register_commands(app):
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(import_records)
+    app.cli.add_command(cache_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(passwords_cli)
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(replicas_cli)
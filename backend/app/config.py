@@ -4,6 +4,81 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'supersecretkey')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///orphan.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool sizing and SQLite pragmas, see app/utils/engine.py: auto (by URL),
+    # sqlite-wal, postgres-pooled or none (SQLAlchemy defaults)
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'auto')
+    # Comma separated read replica URLs for @read_replica handlers. For
+    # REPLICA_STICKY_SECONDS after its own writes a client only reads from a
+    # replica that has caught up on the handler's tables; a replica that cannot
+    # be reached is skipped for REPLICA_RETRY seconds.
+    DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    REPLICA_RETRY = float(os.environ.get('REPLICA_RETRY', 30))
+    # ASGI mode (asgi.py): GETs with an async twin run on the event loop with an
+    # AsyncSession, all other routes on ASGI_SYNC_THREADS threads per worker.
+    # ASGI_ASYNC_VIEWS=0 sends everything through the threads (the sync views).
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the aiosqlite/asyncpg driver.
+    ASGI_ASYNC_VIEWS = os.environ.get('ASGI_ASYNC_VIEWS', '1') != '0'
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', 16))
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
 
+    # Keyset pagination for list endpoints
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 500))
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+    # Seconds the shared dashboard KPIs are served from memory; writes invalidate earlier
+    DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+
+    # Bulk import: rows per INSERT/commit and how many row errors to report
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+
+    # Attempts for versioned inventory updates before answering 409
+    INVENTORY_UPDATE_RETRIES = int(os.environ.get('INVENTORY_UPDATE_RETRIES', 3))
+
+    # Low-stock alerts: full resync of the in-memory critical set (picks up other
+    # workers' writes) and the SSE keep-alive interval, both in seconds
+    CRITICAL_STOCK_RESYNC = float(os.environ.get('CRITICAL_STOCK_RESYNC', 60))
+    ALERT_KEEPALIVE = float(os.environ.get('ALERT_KEEPALIVE', 15))
+    # Seconds an SSE stream holds its worker thread before it is closed; clients
+    # reconnect after ALERT_RETRY_MS and get a fresh snapshot
+    ALERT_STREAM_MAX_SECONDS = float(os.environ.get('ALERT_STREAM_MAX_SECONDS', 300))
+    ALERT_RETRY_MS = int(os.environ.get('ALERT_RETRY_MS', 3000))
+
+    # GET response cache: 'lru' (per worker), 'sqlite' (one file shared by all
+    # workers on the host, at RESPONSE_CACHE_PATH) or 'none'. Size is in entries.
+    # Entries are keyed by database URL, so apps on different databases can
+    # share the file; after resetting a database, run `flask cache clear`.
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'lru')
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH')
+
+    # Password hashing: the bcrypt cost is the login CPU budget (each +1 doubles the
+    # time per hash, `flask passwords calibrate` suggests one); hashes made at another
+    # cost are redone on their next successful login. Hashing runs in a per-worker
+    # thread pool: logins queued beyond PASSWORD_HASH_QUEUE, or expected to wait over
+    # PASSWORD_HASH_MAX_WAIT seconds, get a 503. PASSWORD_HASH_WORKERS=0 hashes in
+    # the request thread instead.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+    PASSWORD_HASH_MAX_WAIT = float(os.environ.get('PASSWORD_HASH_MAX_WAIT', 2))
+
+    # Seconds a login device key (random, stored hashed, issued on remember_device)
+    # lets the same client have its password checked without bcrypt; 0 disables
+    LOGIN_DEVICE_KEY_TTL = int(os.environ.get('LOGIN_DEVICE_KEY_TTL', 3600))
+
+    # Signed-in accounts kept per worker (see app.utils.principals). Profile changes
+    # drop them in the worker that made them; others see them within the TTL.
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 1024))
+    PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+
+    # Seconds before a logout in one worker is seen by the others
+    REVOCATION_SYNC = float(os.environ.get('REVOCATION_SYNC', 2))
+
 
@@ -1,6 +1,32 @@
-from app import db, bcrypt
+from app import db
+from app.utils.passwords import hash_password, verify_password
 from datetime import datetime
 
+
+class SerializerMixin:
+    # Fields exposed by the API, declared once per model. Values are left as-is
+    # (datetimes included) for the app's JSON provider to encode.
+    serialize_fields = ()
+    # Large columns that list endpoints only load when asked for (?fields=)
+    deferred_fields = ()
+    # What list endpoints accept in ?field__op= and ?sort= (see app.utils.filters).
+    # Sort fields must always be set: keyset cursors cannot step over NULLs.
+    filter_fields = ()
+    sort_fields = ()
+
+    @classmethod
+    def columns(cls, fields=None):
+        """Mapped columns for ``fields``, for ORM-free ``select()`` projections."""
+        return [getattr(cls, name) for name in (fields or cls.serialize_fields)]
+
+    @classmethod
+    def list_fields(cls):
+        return [name for name in cls.serialize_fields if name not in cls.deferred_fields]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.serialize_fields}
+
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -9,14 +35,15 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return verify_password(self, password)
     
 # New Donor model for donor authentication
-class Donor(db.Model):
+class Donor(SerializerMixin, db.Model):
     __tablename__ = 'donors'
+    serialize_fields = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'is_active')
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -31,49 +58,38 @@ class Donor(db.Model):
     donations = db.relationship('Donation', backref='donor_account', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return verify_password(self, password)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "email": self.email,
-            "phone": self.phone,
-            "address": self.address,
-            "created_at": self.created_at.isoformat(),
-            "is_active": self.is_active
-        }
-
-
-class Orphan(db.Model):
+
+class Orphan(SerializerMixin, db.Model):
     __tablename__ = 'orphans'
+    serialize_fields = ('id', 'name', 'age', 'gender', 'admission_date', 'background',
+                        'health_status', 'education_status')
+    deferred_fields = ('background',)
+    filter_fields = ('age', 'gender', 'admission_date', 'health_status', 'education_status')
+    sort_fields = ('admission_date', 'age', 'name')
+    __table_args__ = (
+        db.Index('ix_orphans_admission_date_id', 'admission_date', 'id'),
+        db.Index('ix_orphans_age', 'age'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
     gender = db.Column(db.String(10), nullable=False)
-    admission_date = db.Column(db.DateTime, default=datetime.utcnow)
+    admission_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     background = db.Column(db.Text)
     health_status = db.Column(db.String(100))
     education_status = db.Column(db.String(100))
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "gender": self.gender,
-            "admission_date": self.admission_date.isoformat(),
-            "background": self.background,
-            "health_status": self.health_status,
-            "education_status": self.education_status
-        }
-
-class Volunteer(db.Model):
+class Volunteer(SerializerMixin, db.Model):
     __tablename__ = 'volunteers'
+    serialize_fields = ('id', 'name', 'age', 'contact', 'email', 'address', 'join_date')
+    filter_fields = ('age', 'email', 'join_date')
+    sort_fields = ('join_date', 'age', 'name')
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -81,22 +97,20 @@ class Volunteer(db.Model):
     contact = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     address = db.Column(db.String(200))
-    join_date = db.Column(db.DateTime, default=datetime.utcnow)
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "contact": self.contact,
-            "email": self.email,
-            "address": self.address,
-            "join_date": self.join_date.isoformat()
-        }
+    join_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
 # Updated Donation model to link with Donor accounts
-class Donation(db.Model):
+class Donation(SerializerMixin, db.Model):
     __tablename__ = 'donations'
+    serialize_fields = ('id', 'donor_id', 'donor_name', 'age', 'donation_type', 'amount',
+                        'donated_items', 'date', 'status', 'notes')
+    filter_fields = ('donor_id', 'donation_type', 'amount', 'date', 'status')
+    sort_fields = ('date',)
+    __table_args__ = (
+        db.Index('ix_donations_donor_id_date', 'donor_id', 'date'),
+        db.Index('ix_donations_date_id', 'date', 'id'),
+        db.Index('ix_donations_type_date', 'donation_type', 'date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('donors.id'), nullable=True)  # Link to donor account
@@ -105,27 +119,42 @@ class Donation(db.Model):
     donation_type = db.Column(db.String(50), nullable=False)  # Money or Items
     amount = db.Column(db.Float, nullable=True)
     donated_items = db.Column(db.JSON, nullable=True)  # [{'item': 'Rice', 'quantity': 5, 'category': 'Food'}]
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     status = db.Column(db.String(20), default='completed')  # completed, pending, cancelled
     notes = db.Column(db.Text)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "donor_id": self.donor_id,
-            "donor_name": self.donor_name,
-            "age": self.age,
-            "donation_type": self.donation_type,
-            "amount": self.amount,
-            "donated_items": self.donated_items,
-            "date": self.date.isoformat() if self.date else None,
-            "status": self.status,
-            "notes": self.notes
-        }
-
-
-class Event(db.Model):
+    # donated_items, one row per line, for SQL-side aggregation
+    items = db.relationship('DonationItem', backref='donation', lazy=True, cascade='all, delete-orphan')
+
+
+class DonationItem(SerializerMixin, db.Model):
+    __tablename__ = 'donation_items'
+    serialize_fields = ('id', 'donation_id', 'inventory_id', 'item_name', 'category', 'quantity', 'date')
+    __table_args__ = (
+        db.Index('ix_donation_items_item_name_date', 'item_name', 'date'),
+        db.Index('ix_donation_items_date', 'date'),
+        db.Index('ix_donation_items_donation_id', 'donation_id'),
+        db.Index('ix_donation_items_inventory_id', 'inventory_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    donation_id = db.Column(db.Integer, db.ForeignKey('donations.id', ondelete='CASCADE'), nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='SET NULL'), nullable=True)
+    item_name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)  # Copy of the donation's date, so item queries stay on one index
+
+
+class Event(SerializerMixin, db.Model):
     __tablename__ = 'events'
+    serialize_fields = ('id', 'name', 'description', 'date', 'participants', 'location', 'created_at')
+    deferred_fields = ('description',)
+    filter_fields = ('date', 'location', 'participants')
+    sort_fields = ('date', 'name')
+    __table_args__ = (
+        db.Index('ix_events_date_id', 'date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -135,35 +164,41 @@ class Event(db.Model):
     location = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "date": self.date.isoformat(),
-            "participants": self.participants,
-            "location": self.location,
-            "created_at": self.created_at.isoformat()
-        }
-
-class Inventory(db.Model):
+class Inventory(SerializerMixin, db.Model):
     __tablename__ = 'inventory'
+    serialize_fields = ('id', 'item_name', 'category', 'quantity', 'critical_level')
+    filter_fields = ('item_name', 'category', 'quantity', 'critical_level')
+    sort_fields = ('item_name', 'category')
+    __table_args__ = (
+        # Covers name lookups without touching the table on Postgres
+        db.Index('ix_inventory_item_name_category', 'item_name', 'category', unique=True,
+                 postgresql_include=['quantity']),
+        db.Index('ix_inventory_quantity', 'quantity'),
+        db.Index('ix_inventory_category_id', 'category', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)  # 'Food', 'Medical', etc.
     quantity = db.Column(db.Integer, default=0)
+    critical_level = db.Column(db.Integer, nullable=False, default=10, server_default='10')  # Alert at or below this
+    # Bumped on every write; stale ORM updates raise StaleDataError instead of losing stock
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "item_name": self.item_name,
-            "category": self.category,
-            "quantity": self.quantity
-        }
-
-class InventoryLog(db.Model):
+    __mapper_args__ = {'version_id_col': version}
+
+# "At or below threshold" as an indexable expression: quantity - critical_level <= 0
+db.Index('ix_inventory_stock_margin', Inventory.quantity - Inventory.critical_level)
+
+class InventoryLog(SerializerMixin, db.Model):
     __tablename__ = 'inventory_logs'
+    serialize_fields = ('id', 'item_name', 'category', 'action', 'quantity', 'quantity_changed',
+                        'timestamp', 'remarks')
+    filter_fields = ('item_name', 'category', 'action', 'timestamp')
+    sort_fields = ('timestamp',)
+    __table_args__ = (
+        db.Index('ix_inventory_logs_timestamp_id', 'timestamp', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(100), nullable=False)
@@ -171,17 +206,65 @@ class InventoryLog(db.Model):
     action = db.Column(db.String(20), nullable=False)  # 'ADD', 'REMOVE', 'Added', 'Deducted', etc.
     quantity = db.Column(db.Integer, nullable=False)
     quantity_changed = db.Column(db.Integer, nullable=True)  # Add this field for consistency
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     remarks = db.Column(db.String(255))
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "item_name": self.item_name,
-            "category": self.category if hasattr(self, 'category') else None,
-            "action": self.action,
-            "quantity": self.quantity,
-            "quantity_changed": self.quantity_changed if hasattr(self, 'quantity_changed') else None,
-            "timestamp": self.timestamp.isoformat(),
-            "remarks": self.remarks
-        }
+# Running totals for dashboard KPIs, maintained by app.utils.stats
+class StatsCounter(SerializerMixin, db.Model):
+    __tablename__ = 'stats_counters'
+    serialize_fields = ('key', 'count', 'amount')
+
+    key = db.Column(db.String(64), primary_key=True)  # 'orphans', 'donations:2025-06', 'donor:3', ...
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)  # Money total where it applies
+
+
+class DonationRollup(SerializerMixin, db.Model):
+    __tablename__ = 'donation_rollups'
+    serialize_fields = ('grain', 'period', 'key', 'count', 'amount', 'quantity')
+
+    grain = db.Column(db.String(8), primary_key=True)  # 'day' or 'month'
+    key = db.Column(db.String(120), primary_key=True)  # 'total', 'donor:3', 'name:Asha', 'category:Food'
+    period = db.Column(db.String(10), primary_key=True)  # '2025-06-14' or '2025-06'
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)  # Money given
+    quantity = db.Column(db.Integer, nullable=False, default=0)  # Items given (category rows)
+
+
+class TableRevision(db.Model):
+    __tablename__ = 'table_revisions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)  # Bumped by every commit that writes the table
+
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # When the token would have expired anyway
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DeviceKey(db.Model):
+    __tablename__ = 'device_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_type = db.Column(db.String(10), nullable=False)  # 'User' or 'Donor'
+    account_id = db.Column(db.Integer, nullable=False)
+    key_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the key; the key is never stored
+    hash_version = db.Column(db.String(64), nullable=False)  # SHA-256 of the password hash it was issued under
+    password_mac = db.Column(db.String(64), nullable=False)  # HMAC-SHA-256 of the password, keyed by the key
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Clients that wrote recently and must read their writes (see app.utils.replicas)
+class ReplicaPin(db.Model):
+    __tablename__ = 'replica_pins'
+
+    principal = db.Column(db.String(120), primary_key=True)  # 'sub:<jwt subject>' or 'addr:<client address>'
+    until = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,95 @@
+from datetime import date
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.models import Donation, DonationItem
+from app.utils import analytics
+from app.utils.revisions import conditional
+from app.utils.replicas import read_replica
+
+bp = Blueprint('analytics_routes', __name__)
+
+# Rollups change with donations, category rollups with their item lines
+# (a rebuild bumps both)
+ROLLUP_TABLES = (Donation.__tablename__,)
+CATEGORY_TABLES = (DonationItem.__tablename__,)
+GRAINS = ('day', 'week', 'month')
+
+
+def _date_range():
+    # ?from= / ?to=, inclusive ISO dates; raises ValueError on bad input
+    start, end = request.args.get('from'), request.args.get('to')
+    return (date.fromisoformat(start) if start else None,
+            date.fromisoformat(end) if end else None)
+
+
+# Donation count and money per ?grain=day|week|month
+@bp.route('/donations/totals', methods=['GET'])
+@read_replica(*ROLLUP_TABLES)
+@jwt_required()
+@conditional(*ROLLUP_TABLES, cache=True)
+def donation_totals():
+    grain = request.args.get('grain', 'month')
+    if grain not in GRAINS:
+        return jsonify({"error": f"Unsupported grain '{grain}', use day, week or month"}), 400
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be ISO dates (YYYY-MM-DD)"}), 400
+    return jsonify({"grain": grain, "totals": analytics.totals(grain, start, end)}), 200
+
+
+# Items given per category
+@bp.route('/donations/categories', methods=['GET'])
+@read_replica(*CATEGORY_TABLES)
+@jwt_required()
+@conditional(*CATEGORY_TABLES, cache=True)
+def donation_categories():
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be ISO dates (YYYY-MM-DD)"}), 400
+    return jsonify({"categories": analytics.categories(start, end)}), 200
+
+
+# Quantity received per item between ?from and ?to, optionally just ?item=rice
+@bp.route('/donations/items', methods=['GET'])
+@read_replica(DonationItem.__tablename__)
+@jwt_required()
+@conditional(DonationItem.__tablename__, cache=True)
+def donation_items():
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be ISO dates (YYYY-MM-DD)"}), 400
+    return jsonify({"items": analytics.item_totals(start, end, request.args.get('item'))}), 200
+
+
+# Donors ranked by money given (whole months between ?from and ?to)
+@bp.route('/donations/top-donors', methods=['GET'])
+@read_replica(*ROLLUP_TABLES)
+@jwt_required()
+@conditional(*ROLLUP_TABLES, cache=True)
+def top_donors():
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be ISO dates (YYYY-MM-DD)"}), 400
+    return jsonify({"donors": analytics.top_donors(limit, start, end)}), 200
+
+
+# Monthly series for ?years=2024,2025 (defaults to this year and last)
+@bp.route('/donations/year-over-year', methods=['GET'])
+@read_replica(*ROLLUP_TABLES)
+@jwt_required()
+@conditional(*ROLLUP_TABLES, cache=True)
+def year_over_year():
+    raw = request.args.get('years')
+    try:
+        years = sorted({int(year) for year in raw.split(',')}) if raw else [date.today().year - 1, date.today().year]
+    except ValueError:
+        return jsonify({"error": "'years' must be a comma separated list of years"}), 400
+    if len(years) > 20:
+        return jsonify({"error": "At most 20 years at a time"}), 400
+    return jsonify({"years": analytics.year_over_year(years)}), 200
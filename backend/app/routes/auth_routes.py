@@ -2,7 +2,10 @@ from flask import Blueprint, request, jsonify
 from app.models import User
 from app import db
 from app.utils.auth import generate_token
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.passwords import login_check
+from flask_jwt_extended import jwt_required, get_jwt
+from app.utils.revocation import revoke
+from app.utils.principals import current_user
 from app.models import User
 
 bp = Blueprint('auth_routes', __name__)
@@ -40,26 +43,20 @@ def login():
     password = data.get('password')
 
     user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    ok, device_key = login_check(
+        user, password, data.get('device_key'), remember=data.get('remember_device') is True
+    ) if user else (False, None)
+    if not ok:
         return jsonify({'error': 'Invalid credentials'}), 401
 
     token = generate_token(user.id)
-    return jsonify({'message': 'Login successful', 'token': token}), 200
+    return jsonify({'message': 'Login successful', 'token': token, 'device_key': device_key}), 200
 
 
 @bp.route('/me', methods=['GET'])
 @jwt_required()
 def profile():
-    user_id = get_jwt_identity()
-    # Convert user_id back to the appropriate type if needed
-    # If your User model expects an integer ID but jwt_identity returns a string
-    try:
-        if isinstance(user_id, str) and user_id.isdigit():
-            user_id = int(user_id)
-    except:
-        pass
-        
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({'error': 'User not found'}), 404
         
@@ -74,10 +71,10 @@ def profile():
 @jwt_required()
 def logout():
     """
-    Simple logout endpoint that doesn't actually invalidate the token.
-    
-    This is a simpler approach that relies on the client removing the token.
-    The token will still be valid until it expires, but the client will
-    no longer have access to it.
+    Revoke the token used for this request.
+
+    Every worker rejects it within REVOCATION_SYNC seconds (this one at once),
+    until it would have expired anyway.
     """
+    revoke(get_jwt())
     return jsonify({"message": "Successfully logged out"}), 200
\ No newline at end of file
@@ -1,60 +1,133 @@
-from flask import Blueprint, jsonify
+import asyncio
+import time
+
+from flask import Blueprint, jsonify, current_app, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from sqlalchemy import extract, func
-from app import db
+from datetime import datetime, timedelta
 from app.models import User, Orphan, Volunteer, Donation, Inventory, Event
+from app.utils import changes
+from app.utils.stats import get_counters
+from app.utils.critical_stock import critical_stock
+from app.utils.snapshot import TTLSnapshot
+from app.utils.revisions import conditional, conditional_async
+from app.utils.response_cache import get_cache
+from app.utils.passwords import get_hasher
+from app.utils.latency import request_timer
+from app.utils.principals import current_user, current_user_async
+from app.utils.replicas import read_replica
+from app.utils.async_db import async_route, jwt_required_async
 
 bp = Blueprint('dashboard_routes', __name__)
 
+# KPIs are shared by every staff member, so keep one copy per worker
+dashboard_snapshot = TTLSnapshot()
+changes.subscribe(
+    {Orphan.__tablename__, Volunteer.__tablename__, Donation.__tablename__,
+     Inventory.__tablename__, Event.__tablename__},
+    dashboard_snapshot.invalidate
+)
+
+# Everything the response is built from, for its ETag
+DASHBOARD_TABLES = (Orphan.__tablename__, Volunteer.__tablename__, Donation.__tablename__,
+                    Inventory.__tablename__, Event.__tablename__, User.__tablename__)
+
+
+def _dashboard_vary():
+    # Per user (welcome line), and past/upcoming events shift with the clock
+    return get_jwt_identity(), int(time.time() // current_app.config['DASHBOARD_CACHE_TTL'])
+
+
+def build_dashboard_snapshot():
+    now = datetime.utcnow()
+    this_month = f'{now:%Y-%m}'
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+
+    # Totals and monthly buckets come from stats_counters, not table scans
+    counters = get_counters('orphans', 'volunteers', 'events', f'donations:{this_month}', prefix='events:')
+    count = lambda key: counters[key].count if key in counters else 0
+    event_months = {key.split(':', 1)[1]: row.count for key, row in counters.items() if key.startswith('events:')}
+
+    # Only the current month has to be split into past/upcoming by hand
+    upcoming_this_month = Event.query.filter(Event.date >= now, Event.date < next_month).count()
+    upcoming_events = upcoming_this_month + sum(c for month, c in event_months.items() if month > this_month)
+
+    kpis = {
+        "orphans": count('orphans'),
+        "volunteers": count('volunteers'),
+        "donations_this_month": count(f'donations:{this_month}'),
+        "past_events": count('events') - upcoming_events,
+        "upcoming_events": upcoming_events
+    }
+
+    # Inventory: items at or below their critical level, kept in memory
+    kpis['low_inventory_items'] = critical_stock.items()
+
+    # Chart: Events per month
+    per_month = {}
+    for month, c in event_months.items():
+        per_month[int(month[5:])] = per_month.get(int(month[5:]), 0) + c
+    chart_data = [{"month": m, "events": c} for m, c in sorted(per_month.items()) if c]
+
+    return {
+        "kpis": kpis,
+        "charts": {
+            "events_per_month": chart_data
+        }
+    }
+
+# Response cache counters for monitoring (per worker with the lru backend)
+@bp.route('/cache', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    cache = get_cache()
+    if cache is None:
+        return jsonify({"backend": "none"}), 200
+    return jsonify(cache.info()), 200
+
+# Request latency (sign-ins apart from the rest) and hashing pool load, per worker
+@bp.route('/latency', methods=['GET'])
+@jwt_required()
+def get_latency_stats():
+    return jsonify({"requests": request_timer.info(), "password_hashing": get_hasher().info()}), 200
+
 # Add this to your dashboard_route.py
 @bp.route('/test', methods=['GET'])
 def test_route():
     return jsonify({"message": "Dashboard route is working"}), 200
 
 @bp.route('/', methods=['GET'])
+@read_replica(*DASHBOARD_TABLES)
 @jwt_required()
+@conditional(*DASHBOARD_TABLES, vary=_dashboard_vary)
 def get_dashboard_data():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
+    user = current_user()
+    if user is None:
+        abort(404)
 
-    # KPIs
-    num_orphans = Orphan.query.count()
-    num_volunteers = Volunteer.query.count()
-
-    # Donations this month
-    now = datetime.utcnow()
-    donations_this_month = Donation.query.filter(
-        extract('month', Donation.date) == now.month,
-        extract('year', Donation.date) == now.year
-    ).count()
+    snapshot = dashboard_snapshot.get(build_dashboard_snapshot, current_app.config['DASHBOARD_CACHE_TTL'])
 
-    # Inventory: show low quantity items (<10)
-    low_inventory = Inventory.query.filter(Inventory.quantity < 10).all()
-    low_items = [item.to_dict() for item in low_inventory]
+    return jsonify({
+        "welcome": f"Welcome, {user.name}",
+        **snapshot
+    }),200
 
-    # Events
-    past_events = Event.query.filter(Event.date < now).count()
-    upcoming_events = Event.query.filter(Event.date >= now).count()
+# Under the ASGI server: user and ETag on an AsyncSession; the snapshot is only
+# rebuilt (in a thread, with the sync builder) once per DASHBOARD_CACHE_TTL
+@async_route(bp, get_dashboard_data)
+@jwt_required_async
+@conditional_async(*DASHBOARD_TABLES, vary=_dashboard_vary)
+async def get_dashboard_data_async(session):
+    user = await current_user_async(session)
+    if user is None:
+        abort(404)
 
-    # Chart: Events per month
-    monthly_event_data = db.session.query(
-        extract('month', Event.date).label('month'),
-        func.count(Event.id).label('count')
-    ).group_by('month').all()
-    chart_data = [{"month": m, "events": c} for m, c in monthly_event_data]
+    snapshot = dashboard_snapshot.peek()
+    if snapshot is None:
+        snapshot = await asyncio.to_thread(
+            dashboard_snapshot.get, build_dashboard_snapshot, current_app.config['DASHBOARD_CACHE_TTL'])
 
     return jsonify({
         "welcome": f"Welcome, {user.name}",
-        "kpis": {
-            "orphans": num_orphans,
-            "volunteers": num_volunteers,
-            "donations_this_month": donations_this_month,
-            "low_inventory_items": low_items,
-            "past_events": past_events,
-            "upcoming_events": upcoming_events
-        },
-        "charts": {
-            "events_per_month": chart_data
-        }
+        **snapshot
     }),200
@@ -1,7 +1,14 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app import db
 from app.models import Donation
-from app.models import Inventory, InventoryLog
+from app.utils.inventory import attach_items, describe_items, receive_items
+from app.utils.pagination import paginate, page_response
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.revisions import conditional
+from app.utils.export import stream_export
+from app.utils.replicas import read_replica
 
 bp = Blueprint('donation_routes', __name__)
 
@@ -23,25 +30,7 @@ def add_donation():
 
     # Handle inventory update if Things were donated
     if donation_type == 'Things':
-        for item in data.get('donated_items', []):
-            item_name = item.get('item')
-            qty = item.get('quantity', 0)
-            if qty <= 0:
-                continue
-
-            # Update or create inventory item
-            inv_item = Inventory.query.filter_by(item_name=item_name).first()
-            if inv_item:
-                inv_item.quantity += qty
-            else:
-                # Categorize based on common sense
-                category = 'Grocery' if item_name.lower() in ['rice', 'dal', 'milk', 'veggies'] else 'Things'
-                inv_item = Inventory(item_name=item_name, category=category, quantity=qty)
-                db.session.add(inv_item)
-
-            # Log it
-            log = InventoryLog(item_name=item_name, action='ADD', quantity=qty, remarks="Donated")
-            db.session.add(log)
+        attach_items(donation, receive_items(data.get('donated_items', []), remarks="Donated"))
 
     db.session.commit()
     return jsonify({"message": "Donation added", "donation": donation.to_dict()}), 201
@@ -49,12 +38,23 @@ def add_donation():
 
 # Get all donations
 @bp.route('/', methods=['GET'])
+@read_replica(Donation.__tablename__)
+@conditional(Donation.__tablename__, cache=True)
 def get_donations():
-    donations = Donation.query.all()
-    return jsonify([d.to_dict() for d in donations])
+    conditions, keys, descending = list_options(Donation, [Donation.date, Donation.id], descending=True)
+    page = paginate(select(*requested_columns(Donation, keys)).where(*conditions), keys, descending)
+    return page_response(page)
+
+# Stream every donation for audits (?format=ndjson|csv)
+@bp.route('/export', methods=['GET'])
+@read_replica(Donation.__tablename__)
+def export_donations():
+    query = select(*Donation.columns()).order_by(Donation.date.desc(), Donation.id.desc())
+    return stream_export(query, Donation, 'donations')
 
 # Get donation by ID
 @bp.route('/<int:id>', methods=['GET'])
+@conditional(Donation.__tablename__, cache=True)
 def get_donation(id):
     donation = Donation.query.get_or_404(id)
     return jsonify(donation.to_dict())
@@ -71,8 +71,12 @@ def update_donation(id):
     if donation.donation_type == 'Money':
         donation.amount = data.get('amount', donation.amount)
         donation.donated_items = None  # Clear the other field
+        donation.items = []
     elif donation.donation_type == 'Things':
-        donation.donated_items = data.get('donated_items', donation.donated_items)
+        if 'donated_items' in data:
+            # Corrects the record only; stock was adjusted when the donation came in
+            donation.donated_items = data['donated_items']
+            attach_items(donation, describe_items(donation.donated_items))
         donation.amount = None  # Clear the other field
 
     db.session.commit()
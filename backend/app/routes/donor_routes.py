@@ -1,9 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import select
 from app import db
-from app.models import Donor, Donation, Inventory, InventoryLog
+from app.models import Donor, Donation, Inventory
 from datetime import datetime
 from app.utils.auth import generate_token
+from app.utils.pagination import paginate, get_limit
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.stats import get_counters
+from app.utils.inventory import attach_items, receive_items
+from app.utils.critical_stock import critical_stock
+from app.utils.passwords import HasherBusy, login_check
+from app.utils.revocation import revoke
+from app.utils.principals import current_donor
 bp = Blueprint('donor_routes', __name__)
 
 # Donor Authentication Routes
@@ -41,6 +51,8 @@ def register():
             'token': token
         }), 201
         
+    except HasherBusy:
+        raise  # 503 with Retry-After, not a 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -52,19 +64,21 @@ def donor_login():
     password = data.get('password')
 
     donor = Donor.query.filter_by(email=email).first()
-    if not donor or not donor.check_password(password):
+    ok, device_key = login_check(
+        donor, password, data.get('device_key'), remember=data.get('remember_device') is True
+    ) if donor else (False, None)
+    if not ok:
         return jsonify({'error': 'Invalid credentials'}), 401
 
     token = generate_token(donor.id)  # Use your JWT utility
-    return jsonify({'message': 'Login successful', 'token': token}), 200
+    return jsonify({'message': 'Login successful', 'token': token, 'device_key': device_key}), 200
 
-# Donor logout
-# @bp.route('/logout', methods=['POST'])
-# def logout():
-#     session.pop('donor_id', None)
-#     session.pop('donor_name', None)
-#     session.pop('user_type', None)
-#     return jsonify({'message': 'Logged out successfully'}), 200
+# Donor logout: revokes the token (see app.utils.revocation)
+@bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    revoke(get_jwt())
+    return jsonify({'message': 'Logged out successfully'}), 200
 
 # Check authentication status
 # @bp.route('/auth-status', methods=['GET'])
@@ -84,8 +98,7 @@ def donor_login():
 @jwt_required()
 def make_donation():
     try:
-        donor_id = get_jwt_identity()
-        donor = Donor.query.get(donor_id)
+        donor = current_donor()
         if not donor:
             return jsonify({'error': 'Donor not found'}), 404
 
@@ -127,14 +140,6 @@ def make_donation():
                         'quantity': item_data['quantity'],
                         'category': item_data['category']
                     })
-                    
-                    # Update inventory
-                    update_inventory_from_donation(
-                        item_name=item_data['item'],
-                        category=item_data['category'],
-                        quantity=item_data['quantity'],
-                        donor_id=donor.id
-                    )
             
             if not donated_items:
                 return jsonify({'error': 'At least one item with quantity > 0 is required'}), 400
@@ -142,19 +147,12 @@ def make_donation():
             donation.donated_items = donated_items
         
         db.session.add(donation)
-        db.session.commit()
-        
-        # Add inventory logs for item donations
+
+        # Update inventory and logs in the same transaction as the donation
         if donation_type == 'Items':
-            for item in donated_items:
-                log_donation(
-                    donation_id=donation.id,
-                    donor_id=donor.id,
-                    item_name=item['item'],
-                    category=item['category'],
-                    quantity=item['quantity'],
-                    donor_name=donor.name
-                )
+            attach_items(donation, receive_items(donated_items, remarks=f"Donated by {donor.name}"))
+
+        db.session.commit()
         
         return jsonify({
             'message': 'Donation successful!',
@@ -169,20 +167,23 @@ def make_donation():
 @bp.route('/donations', methods=['GET'])
 @jwt_required()
 def get_my_donations():
+    # 'per_page' is still accepted from older clients
+    limit = get_limit('per_page' if 'per_page' in request.args else 'limit')
+    conditions, keys, descending = list_options(Donation, [Donation.date, Donation.id], descending=True)
+    columns = requested_columns(Donation, keys)
     try:
         donor_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        donations = Donation.query.filter_by(donor_id=donor_id)\
-                                .order_by(Donation.date.desc())\
-                                .paginate(page=page, per_page=per_page, error_out=False)
+        page = paginate(
+            select(*columns).where(Donation.donor_id == donor_id, *conditions),
+            keys,
+            descending=descending,
+            limit=limit
+        )
         
         return jsonify({
-            'donations': [donation.to_dict() for donation in donations.items],
-            'total': donations.total,
-            'pages': donations.pages,
-            'current_page': page
+            'donations': [dict(row) for row in page.items],
+            'next_cursor': page.next_cursor,
+            'limit': page.limit
         }), 200
         
     except Exception as e:
@@ -209,12 +210,8 @@ def get_donation(id):
 def get_critical_items():
     try:
         # Optionally, you can use donor_id = get_jwt_identity() if you want to log or filter by donor
-        critical_items = Inventory.query.filter(
-            Inventory.quantity <= Inventory.critical_level
-        ).order_by(Inventory.category, Inventory.item_name).all()
-        
         return jsonify({
-            'critical_items': [item.to_dict() for item in critical_items]
+            'critical_items': critical_stock.items()
         }), 200
         
     except Exception as e:
@@ -249,8 +246,7 @@ def get_inventory_items():
 @jwt_required()
 def get_profile():
     try:
-        donor_id = get_jwt_identity()
-        donor = Donor.query.get(donor_id)
+        donor = current_donor()
         if not donor:
             return jsonify({'error': 'Donor not found'}), 404
         
@@ -264,9 +260,9 @@ def get_profile():
 @jwt_required()
 def update_profile():
     try:
-        donor_id = get_jwt_identity()
-        donor = Donor.query.get(donor_id)
-        if not donor:
+        # The cached principal is read-only; this one gets changed
+        donor = Donor.query.get(get_jwt_identity())
+        if not donor or donor.is_active is False:
             return jsonify({'error': 'Donor not found'}), 404
         
         data = request.get_json()
@@ -290,6 +286,9 @@ def update_profile():
             'donor': donor.to_dict()
         }), 200
         
+    except HasherBusy:
+        db.session.rollback()
+        raise  # 503 with Retry-After, not a 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -302,17 +301,15 @@ def get_dashboard_stats():
         donor_id = get_jwt_identity()
         
         # Get donation statistics
-        total_donations = Donation.query.filter_by(donor_id=donor_id).count()
-        total_money_donated = db.session.query(db.func.sum(Donation.amount))\
-            .filter_by(donor_id=donor_id, donation_type='Money').scalar() or 0
+        counter = get_counters(f'donor:{donor_id}').get(f'donor:{donor_id}')
+        total_donations = counter.count if counter else 0
+        total_money_donated = counter.amount if counter else 0
         
         recent_donations = Donation.query.filter_by(donor_id=donor_id)\
             .order_by(Donation.date.desc()).limit(5).all()
         
         # Get critical items count
-        critical_items_count = Inventory.query.filter(
-            Inventory.quantity <= Inventory.critical_level
-        ).count()
+        critical_items_count = critical_stock.count()
         
         return jsonify({
             'total_donations': total_donations,
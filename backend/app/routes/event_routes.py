@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app import db
 from app.models import Event
+from app.utils.pagination import paginate, paginate_async, page_response
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.revisions import conditional, conditional_async
+from app.utils.async_db import async_route
 from datetime import datetime
 
 
@@ -23,12 +29,23 @@ def add_event():
 
 # Get all events
 @bp.route('/', methods=['GET'])
+@conditional(Event.__tablename__, cache=True)
 def get_events():
-    events = Event.query.order_by(Event.date.desc()).all()
-    return jsonify([e.to_dict() for e in events])
+    conditions, keys, descending = list_options(Event, [Event.date, Event.id], descending=True)
+    page = paginate(select(*requested_columns(Event, keys)).where(*conditions), keys, descending)
+    return page_response(page)
+
+# Same list on an AsyncSession, under the ASGI server
+@async_route(bp, get_events)
+@conditional_async(Event.__tablename__, cache=True)
+async def get_events_async(session):
+    conditions, keys, descending = list_options(Event, [Event.date, Event.id], descending=True)
+    page = await paginate_async(session, select(*requested_columns(Event, keys)).where(*conditions), keys, descending)
+    return page_response(page)
 
 # Get event by ID
 @bp.route('/<int:id>', methods=['GET'])
+@conditional(Event.__tablename__, cache=True)
 def get_event(id):
     event = Event.query.get_or_404(id)
     return jsonify(event.to_dict())
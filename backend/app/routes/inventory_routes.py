@@ -1,18 +1,55 @@
-from flask import Blueprint, request, jsonify
+import json
+import queue
+import time
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import insert, select
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
 from app.models import Inventory, InventoryLog
+from app.utils.inventory import deduct_stock, deduct_stock_many
+from app.utils.critical_stock import critical_stock
+from app.utils.pagination import paginate, paginate_async, page_response
+from app.utils.export import stream_export
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.revisions import conditional, conditional_async
+from app.utils.async_db import async_route
+from app.utils.bulk_import import import_request
+from app.utils.replicas import read_replica
 
 bp = Blueprint('inventory_routes', __name__)
 
 @bp.route('/', methods=['GET'])
+@conditional(Inventory.__tablename__, cache=True)
 def get_inventory():
-    items = Inventory.query.all()
-    return jsonify([item.to_dict() for item in items])
+    conditions, keys, descending = list_options(Inventory, [Inventory.id])
+    page = paginate(select(*requested_columns(Inventory, keys)).where(*conditions), keys, descending)
+    return page_response(page)
+
+# Same list on an AsyncSession, under the ASGI server
+@async_route(bp, get_inventory)
+@conditional_async(Inventory.__tablename__, cache=True)
+async def get_inventory_async(session):
+    conditions, keys, descending = list_options(Inventory, [Inventory.id])
+    page = await paginate_async(session, select(*requested_columns(Inventory, keys)).where(*conditions),
+                                keys, descending)
+    return page_response(page)
 
 @bp.route('/logs', methods=['GET'])
+@read_replica(InventoryLog.__tablename__)
+@conditional(InventoryLog.__tablename__, cache=True)
 def get_logs():
-    logs = InventoryLog.query.order_by(InventoryLog.timestamp.desc()).all()
-    return jsonify([log.to_dict() for log in logs])
+    conditions, keys, descending = list_options(InventoryLog, [InventoryLog.timestamp, InventoryLog.id],
+                                                descending=True)
+    page = paginate(select(*requested_columns(InventoryLog, keys)).where(*conditions), keys, descending)
+    return page_response(page)
+
+# Stream every log row for audits (?format=ndjson|csv)
+@bp.route('/logs/export', methods=['GET'])
+@read_replica(InventoryLog.__tablename__)
+def export_logs():
+    query = select(*InventoryLog.columns()).order_by(InventoryLog.timestamp.desc(), InventoryLog.id.desc())
+    return stream_export(query, InventoryLog, 'inventory_logs')
 
 @bp.route('/deduct', methods=['POST'])
 def deduct_inventory():
@@ -20,11 +57,15 @@ def deduct_inventory():
     item_name = data.get('item')
     qty = data.get('quantity')
 
-    inv_item = Inventory.query.filter_by(item_name=item_name).first()
-    if not inv_item or inv_item.quantity < qty:
-        return jsonify({"error": "Insufficient stock"}), 400
+    # type() rather than isinstance(): JSON true/false would pass as 1/0
+    if type(qty) is not int or qty <= 0:
+        return jsonify({"error": "Quantity must be a positive integer"}), 400
 
-    inv_item.quantity -= qty
+    inv_item = db.session.query(Inventory.id, Inventory.category)\
+        .filter_by(item_name=item_name).order_by(Inventory.id).first()
+    if not inv_item or not deduct_stock(inv_item.id, qty):
+        db.session.rollback()
+        return jsonify({"error": "Insufficient stock"}), 400
 
     # Updated to match our model
     log = InventoryLog(
@@ -40,6 +81,59 @@ def deduct_inventory():
 
     return jsonify({"message": f"{qty} {item_name} removed from inventory."})
 
+# Deduct several items in one transaction: either all of them or none
+@bp.route('/deduct/batch', methods=['POST'])
+def deduct_inventory_batch():
+    data = request.get_json()
+    entries = data.get('items') if isinstance(data, dict) else data
+    remarks = data.get('remarks', 'Used') if isinstance(data, dict) else 'Used'
+
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"error": "A non-empty list of items is required"}), 400
+
+    wanted = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('item') \
+                or type(entry.get('quantity')) is not int or entry['quantity'] <= 0:
+            return jsonify({"error": "Each entry needs an item and a positive integer quantity"}), 400
+        wanted[entry['item']] = wanted.get(entry['item'], 0) + entry['quantity']
+
+    # One lookup for every item; the oldest row wins for duplicate names, as in /deduct
+    found = {}
+    for row in db.session.query(Inventory.id, Inventory.item_name, Inventory.category)\
+            .filter(Inventory.item_name.in_(wanted)).order_by(Inventory.id.desc()):
+        found[row.item_name] = row
+
+    missing = [name for name in wanted if name not in found]
+    if missing:
+        return jsonify({"error": "Item not found", "items": missing}), 404
+
+    if not deduct_stock_many({found[name].id: qty for name, qty in wanted.items()}):
+        db.session.rollback()
+        # Re-read so the client sees what is actually short right now
+        available = dict(db.session.query(Inventory.item_name, Inventory.quantity)
+                         .filter(Inventory.id.in_([row.id for row in found.values()])))
+        short = [
+            {"item": name, "requested": qty, "available": available.get(name) or 0}
+            for name, qty in wanted.items() if (available.get(name) or 0) < qty
+        ]
+        return jsonify({"error": "Insufficient stock", "items": short}), 400
+
+    db.session.execute(insert(InventoryLog), [
+        {
+            'item_name': entry['item'],
+            'category': found[entry['item']].category,
+            'action': 'REMOVE',
+            'quantity': entry['quantity'],
+            'quantity_changed': -entry['quantity'],
+            'remarks': remarks,
+        }
+        for entry in entries
+    ])
+    db.session.commit()
+
+    return jsonify({"message": f"{len(wanted)} items removed from inventory.", "items": wanted})
+
 # ✅ Add New Inventory Item
 @bp.route('/add', methods=['POST'])
 def add_inventory():
@@ -47,16 +141,22 @@ def add_inventory():
     item_name = data.get('item_name')
     category = data.get('category')
     quantity = data.get('quantity', 0)
+    critical_level = data.get('critical_level', 10)
 
     if not item_name or not category:
         return jsonify({"error": "Item name and category required"}), 400
+    if type(quantity) is not int or quantity < 0:
+        return jsonify({"error": "Quantity must be a non-negative integer"}), 400
+    if type(critical_level) is not int or critical_level < 0:
+        return jsonify({"error": "critical_level must be a non-negative integer"}), 400
 
     existing = Inventory.query.filter_by(item_name=item_name, category=category).first()
     if existing:
         return jsonify({"error": "Item already exists. Use update instead."}), 400
 
-    item = Inventory(item_name=item_name, category=category, quantity=quantity)
+    item = Inventory(item_name=item_name, category=category, quantity=quantity, critical_level=critical_level)
     db.session.add(item)
+    critical_stock.touch(db.session, names=[item_name])
 
     # Log it - updated to match our model
     log = InventoryLog(
@@ -72,6 +172,12 @@ def add_inventory():
 
     return jsonify({"message": "Item added", "item": item.to_dict()}), 201
 
+# ✅ Import many inventory items from a CSV or NDJSON body/file
+@bp.route('/bulk', methods=['POST'])
+def bulk_add_inventory():
+    report, status = import_request('inventory')
+    return jsonify(report), status
+
 # ✅ Update Inventory Quantity (add or subtract)
 @bp.route('/update', methods=['PUT'])
 def update_inventory():
@@ -79,31 +185,49 @@ def update_inventory():
     item_name = data.get('item_name')
     category = data.get('category')
     quantity_change = data.get('quantity_change', 0)  # can be negative
+    critical_level = data.get('critical_level')  # optional new alert threshold
 
-    item = Inventory.query.filter_by(item_name=item_name, category=category).first()
-    if not item:
-        return jsonify({"error": "Item not found"}), 404
+    if type(quantity_change) is not int:
+        return jsonify({"error": "quantity_change must be an integer"}), 400
+    if critical_level is not None and (type(critical_level) is not int or critical_level < 0):
+        return jsonify({"error": "critical_level must be a non-negative integer"}), 400
 
-    if item.quantity + quantity_change < 0:
-        return jsonify({"error": "Insufficient quantity"}), 400
+    # Optimistic concurrency: the commit only succeeds if nobody else changed the
+    # item since we read it (version_id_col), otherwise re-read and try again
+    for _ in range(current_app.config['INVENTORY_UPDATE_RETRIES']):
+        item = Inventory.query.filter_by(item_name=item_name, category=category).first()
+        if not item:
+            return jsonify({"error": "Item not found"}), 404
 
-    old_quantity = item.quantity
-    item.quantity += quantity_change
+        if item.quantity + quantity_change < 0:
+            return jsonify({"error": "Insufficient quantity"}), 400
 
-    # Log it - updated to match our model
-    action = "Added" if quantity_change > 0 else "Deducted"
-    log = InventoryLog(
-        item_name=item_name,
-        category=category,
-        action=action,
-        quantity=item.quantity,  # Current quantity after change
-        quantity_changed=quantity_change,
-        remarks=f"Updated from {old_quantity} to {item.quantity}"
-    )
-    db.session.add(log)
-    db.session.commit()
+        old_quantity = item.quantity
+        item.quantity += quantity_change
+        if critical_level is not None:
+            item.critical_level = critical_level
+        critical_stock.touch(db.session, ids=[item.id])
 
-    return jsonify({"message": f"Inventory {action.lower()}", "item": item.to_dict()})
+        # Log it - updated to match our model
+        action = "Added" if quantity_change > 0 else "Deducted"
+        log = InventoryLog(
+            item_name=item_name,
+            category=category,
+            action=action,
+            quantity=item.quantity,  # Current quantity after change
+            quantity_changed=quantity_change,
+            remarks=f"Updated from {old_quantity} to {item.quantity}"
+        )
+        db.session.add(log)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            continue
+
+        return jsonify({"message": f"Inventory {action.lower()}", "item": item.to_dict()})
+
+    return jsonify({"error": "Item is being updated concurrently, please retry"}), 409
 
 # ✅ Delete an Inventory Item
 @bp.route('/delete/<int:item_id>', methods=['DELETE'])
@@ -113,6 +237,7 @@ def delete_inventory(item_id):
         return jsonify({"error": "Item not found"}), 404
 
     db.session.delete(item)
+    critical_stock.touch(db.session, ids=[item_id])
 
     # Log deletion - updated to match our model
     log = InventoryLog(
@@ -124,6 +249,44 @@ def delete_inventory(item_id):
         remarks=f"Deleted item with quantity {item.quantity}"
     )
     db.session.add(log)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"error": "Item changed while deleting, please retry"}), 409
+
+    return jsonify({"message": "Item deleted", "item_name": item.item_name})
+
+def _sse(kind, data):
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+# Server-sent events for items crossing their critical_level
+@bp.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    subscriber = critical_stock.subscribe()
+
+    def generate():
+        # A sync worker thread per open stream: close it after a while and let
+        # EventSource reconnect, rather than hold the thread forever
+        deadline = time.monotonic() + current_app.config['ALERT_STREAM_MAX_SECONDS']
+        try:
+            # Current state first, then only the crossings
+            yield f"retry: {current_app.config['ALERT_RETRY_MS']}\n\n"
+            yield _sse('snapshot', critical_stock.items())
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    alert = subscriber.get(timeout=min(current_app.config['ALERT_KEEPALIVE'], remaining))
+                except queue.Empty:
+                    # Picks up other workers' changes on the resync interval
+                    critical_stock.sync()
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(alert['type'], alert['item'])
+        finally:
+            critical_stock.unsubscribe(subscriber)
 
-    return jsonify({"message": "Item deleted", "item_name": item.item_name})
\ No newline at end of file
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,17 +1,27 @@
 # app/routes/orphan_routes.py
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app.models import Orphan
+from app.utils.pagination import paginate, page_response
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.revisions import conditional
+from app.utils.bulk_import import import_request
 
 from app import db
 
 bp = Blueprint('orphans', __name__)
 
 @bp.route('/', methods=['GET'])
+@conditional(Orphan.__tablename__, cache=True)
 def get_all_orphans():
-    orphans = Orphan.query.all()
-    return jsonify([orphan.to_dict() for orphan in orphans]), 200
+    # Plain result rows, no ORM objects to build and track
+    conditions, keys, descending = list_options(Orphan, [Orphan.id])
+    page = paginate(select(*requested_columns(Orphan, keys)).where(*conditions), keys, descending)
+    return page_response(page), 200
 
 @bp.route('/<int:id>', methods=['GET'])
+@conditional(Orphan.__tablename__, cache=True)
 def get_orphan(id):
     orphan = Orphan.query.get_or_404(id)
     return jsonify(orphan.to_dict()), 200
@@ -31,6 +41,12 @@ def add_orphan():
     db.session.commit()
     return jsonify(new_orphan.to_dict()), 201
 
+# Import many orphans from a CSV or NDJSON body/file
+@bp.route('/bulk', methods=['POST'])
+def bulk_add_orphans():
+    report, status = import_request('orphans')
+    return jsonify(report), status
+
 @bp.route('/<int:id>', methods=['PUT'])
 def update_orphan(id):
     orphan = Orphan.query.get_or_404(id)
@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from app import db
+from app.utils.pagination import get_limit, page_response
+from app.utils.search import KINDS, search, supported
+from app.utils.replicas import read_replica
+
+bp = Blueprint('search_routes', __name__)
+
+
+# Ranked full-text hits across orphans, volunteers, donations and events
+# (?q=, optional ?type=orphans,events, keyset pages via ?after=)
+@bp.route('', methods=['GET'])
+@read_replica(*KINDS)  # search_index follows these tables
+def search_records():
+    query = request.args.get('q', '').strip()
+    if not query or not any(ch.isalnum() for ch in query):
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+    kinds = [kind.strip() for kind in request.args.get('type', '').split(',') if kind.strip()] or KINDS
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown type: {', '.join(unknown)}, use {', '.join(KINDS)}"}), 400
+
+    connection = db.session.connection()
+    if not supported(connection):
+        return jsonify({"error": f"Search is not available on {connection.dialect.name}"}), 501
+
+    page = search(connection, query, kinds, get_limit(), request.args.get('after'))
+    return page_response(page)
@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app import db
 from app.models import Volunteer
+from app.utils.pagination import paginate, page_response
+from app.utils.serialization import requested_columns
+from app.utils.filters import list_options
+from app.utils.revisions import conditional
+from app.utils.bulk_import import import_request
 
 bp = Blueprint('volunteer_routes', __name__)
 
@@ -19,14 +25,23 @@ def add_volunteer():
     db.session.commit()
     return jsonify({"message": "Volunteer added successfully", "volunteer": volunteer.to_dict()}), 201
 
+# Import many volunteers from a CSV or NDJSON body/file
+@bp.route('/bulk', methods=['POST'])
+def bulk_add_volunteers():
+    report, status = import_request('volunteers')
+    return jsonify(report), status
+
 # Get all volunteers
 @bp.route('/', methods=['GET'])
+@conditional(Volunteer.__tablename__, cache=True)
 def get_volunteers():
-    volunteers = Volunteer.query.all()
-    return jsonify([v.to_dict() for v in volunteers])
+    conditions, keys, descending = list_options(Volunteer, [Volunteer.id])
+    page = paginate(select(*requested_columns(Volunteer, keys)).where(*conditions), keys, descending)
+    return page_response(page)
 
 # Get a single volunteer by ID
 @bp.route('/<int:id>', methods=['GET'])
+@conditional(Volunteer.__tablename__, cache=True)
 def get_volunteer(id):
     volunteer = Volunteer.query.get_or_404(id)
     return jsonify(volunteer.to_dict())
@@ -0,0 +1,289 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Donation, DonationItem, DonationRollup, Donor
+from app.utils import changes
+from app.utils.sql import dialect_insert, supports_upsert
+
+# donation_rollups rows, per grain ('day' -> 'YYYY-MM-DD', 'month' -> 'YYYY-MM'):
+#   total                   every donation (amount = money given)
+#   donor:<id> / name:<n>   one donor, by account or by the name typed in
+#   category:<c>            item lines of that category (quantity = items given)
+
+# Columns the rollups are built from. Category totals come from donation_items,
+# whose categories were resolved against stock by receive_items.
+_TRACKED = {
+    Donation: ('date', 'donor_id', 'donor_name', 'donation_type', 'amount'),
+    DonationItem: ('date', 'category', 'quantity'),
+}
+
+
+def _donor_key(values):
+    if values['donor_id']:
+        return f"donor:{values['donor_id']}"
+    if values['donor_name']:
+        return f"name:{values['donor_name']}"
+    return None
+
+
+def _contributions(kind, values):
+    """((grain, period, key), count, amount, quantity) tuples one donation or item line adds to the rollups."""
+    when = values['date']
+    if not when:
+        return []
+
+    if kind is DonationItem:
+        rows = [(f"category:{values['category']}", 1, 0.0, values['quantity'])]
+    else:
+        money = float(values['amount'] or 0) if values['donation_type'] == 'Money' else 0.0
+        rows = [('total', 1, money, 0)]
+        donor = _donor_key(values)
+        if donor:
+            rows.append((donor, 1, money, 0))
+
+    periods = [('day', f'{when:%Y-%m-%d}'), ('month', f'{when:%Y-%m}')]
+    return [((grain, period, key), count, amount, quantity)
+            for grain, period in periods for key, count, amount, quantity in rows]
+
+
+def _values(obj, previous=None):
+    values = {name: getattr(obj, name) for name in _TRACKED[type(obj)]}
+    values.update(previous or {})
+    return values
+
+
+def _previous_values(obj):
+    state = inspect(obj)
+    previous = {}
+    for name in _TRACKED[type(obj)]:
+        history = state.attrs[name].history
+        if history.deleted:
+            previous[name] = history.deleted[0]
+    return previous or None
+
+
+def apply_rollup_deltas(connection, deltas):
+    """Add ``deltas`` ({(grain, period, key): [count, amount, quantity]}) to donation_rollups."""
+    rows = [
+        {'grain': grain, 'period': period, 'key': key, 'count': count, 'amount': amount, 'quantity': quantity}
+        for (grain, period, key), (count, amount, quantity) in deltas.items()
+        if count or amount or quantity
+    ]
+    if not rows:
+        return
+    table = DonationRollup.__table__
+
+    if supports_upsert(connection):
+        stmt = dialect_insert(connection, table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.grain, table.c.period, table.c.key],
+            set_={'count': table.c.count + stmt.excluded.count,
+                  'amount': table.c.amount + stmt.excluded.amount,
+                  'quantity': table.c.quantity + stmt.excluded.quantity}
+        ))
+        return
+
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.grain == row['grain'], table.c.period == row['period'], table.c.key == row['key'])
+            .values(count=table.c.count + row['count'], amount=table.c.amount + row['amount'],
+                    quantity=table.c.quantity + row['quantity'])
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_rollups(session, flush_context):
+    deltas = {}
+
+    def add(obj, values, sign):
+        for key, count, amount, quantity in _contributions(type(obj), values):
+            delta = deltas.setdefault(key, [0, 0.0, 0])
+            delta[0] += sign * count
+            delta[1] += sign * amount
+            delta[2] += sign * quantity
+
+    for obj in session.new:
+        if type(obj) in _TRACKED:
+            add(obj, _values(obj), 1)
+    for obj in session.deleted:
+        if type(obj) in _TRACKED:
+            add(obj, _values(obj, _previous_values(obj)), -1)
+    for obj in session.dirty:
+        if type(obj) in _TRACKED:
+            previous = _previous_values(obj)
+            if previous:
+                add(obj, _values(obj, previous), -1)
+                add(obj, _values(obj), 1)
+        if isinstance(obj, Donation):
+            # Lines dropped from donation.items are deleted as orphans during
+            # the flush, so they never show up in session.deleted
+            for item in inspect(obj).attrs['items'].history.deleted:
+                if inspect(item).has_identity and item not in session.deleted:
+                    add(item, _values(item, _previous_values(item)), -1)
+
+    if deltas:
+        # Same transaction as the donations themselves
+        apply_rollup_deltas(session.connection(), deltas)
+
+
+# Set-based rebuild: one statement per rollup family instead of loading
+# donations into Python
+_DAY = {'sqlite': "strftime('%Y-%m-%d', {}.date)", 'postgresql': "to_char({}.date, 'YYYY-MM-DD')"}
+_MONEY = "coalesce(sum(CASE WHEN d.donation_type = 'Money' THEN d.amount END), 0)"
+
+
+def rebuild_rollups(session):
+    """Recompute donation_rollups from the donations and donation_items tables. Returns the number of rows written."""
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect not in _DAY:
+        raise RuntimeError(f'Rollup rebuild is not available on {dialect}')
+
+    day, item_day = _DAY[dialect].format('d'), _DAY[dialect].format('di')
+    donor = ("CASE WHEN d.donor_id IS NOT NULL THEN 'donor:' || CAST(d.donor_id AS VARCHAR) "
+             "ELSE 'name:' || d.donor_name END")
+
+    connection.execute(text('DELETE FROM donation_rollups'))
+    insert = 'INSERT INTO donation_rollups (grain, period, key, count, amount, quantity) '
+    connection.execute(text(
+        insert + f"SELECT 'day', {day}, 'total', count(*), {_MONEY}, 0 "
+                 f"FROM donations d GROUP BY {day}"
+    ))
+    connection.execute(text(
+        insert + f"SELECT 'day', {day}, {donor}, count(*), {_MONEY}, 0 FROM donations d "
+                 f"GROUP BY {day}, {donor}"
+    ))
+    connection.execute(text(
+        insert + f"SELECT 'day', {item_day}, 'category:' || di.category, count(*), 0, sum(di.quantity) "
+                 f"FROM donation_items di GROUP BY {item_day}, di.category"
+    ))
+    # Months are the sum of their days
+    connection.execute(text(
+        insert + "SELECT 'month', substr(period, 1, 7), key, sum(count), sum(amount), sum(quantity) "
+                 "FROM donation_rollups WHERE grain = 'day' GROUP BY substr(period, 1, 7), key"
+    ))
+    written = connection.execute(select(func.count()).select_from(DonationRollup)).scalar()
+    # Rollups keep no revision of their own: views built from them are
+    # tagged with the donations and donation_items revisions, so bump those
+    changes.mark_changed(session, Donation.__tablename__, DonationItem.__tablename__)
+    session.commit()
+    return written
+
+
+def _rollups(grain, prefix, start=None, end=None):
+    """Rollup rows whose key is or starts with ``prefix`` ('total', 'category:'), periods within [start, end]."""
+    if prefix.endswith(':'):
+        # A key range rather than LIKE, so the primary key index is used
+        keys = (DonationRollup.key >= prefix, DonationRollup.key < prefix[:-1] + ';')
+    else:
+        keys = (DonationRollup.key == prefix,)
+    query = select(DonationRollup).where(DonationRollup.grain == grain, *keys)
+    if start:
+        query = query.where(DonationRollup.period >= start)
+    if end:
+        query = query.where(DonationRollup.period <= end)
+    return db.session.execute(query.order_by(DonationRollup.period)).scalars().all()
+
+
+def totals(grain, start=None, end=None):
+    """Donation count and money per day, ISO week or month, oldest first."""
+    if grain == 'month':
+        rows = _rollups('month', 'total', start and f'{start:%Y-%m}', end and f'{end:%Y-%m}')
+        return [{'period': row.period, 'count': row.count, 'amount': row.amount} for row in rows]
+
+    rows = _rollups('day', 'total', start and start.isoformat(), end and end.isoformat())
+    if grain == 'day':
+        return [{'period': row.period, 'count': row.count, 'amount': row.amount} for row in rows]
+
+    weeks = {}
+    for row in rows:
+        year, week, _ = date.fromisoformat(row.period).isocalendar()
+        bucket = weeks.setdefault(f'{year}-W{week:02d}', {'count': 0, 'amount': 0.0})
+        bucket['count'] += row.count
+        bucket['amount'] += row.amount
+    return [{'period': period, **values} for period, values in sorted(weeks.items())]
+
+
+def categories(start=None, end=None):
+    """Items given per category, most given first."""
+    if start or end:
+        rows = _rollups('day', 'category:', start and start.isoformat(), end and end.isoformat())
+    else:
+        rows = _rollups('month', 'category:')
+    quantity, lines = Counter(), Counter()
+    for row in rows:
+        category = row.key.split(':', 1)[1]
+        quantity[category] += row.quantity
+        lines[category] += row.count
+    return [{'category': category, 'quantity': total, 'lines': lines[category]}
+            for category, total in quantity.most_common() if total]
+
+
+def top_donors(limit, start=None, end=None):
+    """Donors by money given (then number of donations), from monthly rollups."""
+    amount, count = Counter(), Counter()
+    for prefix in ('donor:', 'name:'):
+        for row in _rollups('month', prefix, start and f'{start:%Y-%m}', end and f'{end:%Y-%m}'):
+            amount[row.key] += row.amount
+            count[row.key] += row.count
+
+    ranked = sorted((key for key in count if count[key] > 0), key=lambda key: (-amount[key], -count[key], key))
+    ranked = ranked[:limit]
+    ids = [int(key.split(':', 1)[1]) for key in ranked if key.startswith('donor:')]
+    names = dict(db.session.execute(select(Donor.id, Donor.name).where(Donor.id.in_(ids))).all()) if ids else {}
+
+    result = []
+    for key in ranked:
+        kind, value = key.split(':', 1)
+        donor_id = int(value) if kind == 'donor' else None
+        result.append({
+            'donor_id': donor_id,
+            'donor_name': names.get(donor_id) if donor_id else value,
+            'donations': count[key],
+            'amount': amount[key],
+        })
+    return result
+
+
+def year_over_year(years):
+    """Monthly count and money for each of ``years``: at most 12 rollup rows per year."""
+    rows = db.session.execute(
+        select(DonationRollup).where(
+            DonationRollup.grain == 'month', DonationRollup.key == 'total',
+            DonationRollup.period.in_([f'{year}-{month:02d}' for year in years for month in range(1, 13)])
+        )
+    ).scalars().all()
+    found = {row.period: row for row in rows}
+
+    series = {}
+    for year in years:
+        months = []
+        for month in range(1, 13):
+            row = found.get(f'{year}-{month:02d}')
+            months.append({'month': month, 'count': row.count if row else 0, 'amount': row.amount if row else 0.0})
+        series[str(year)] = months
+    return series
+
+
+def item_totals(start=None, end=None, name=None):
+    """Quantity received per item name, most received first: one group-by over donation_items."""
+    query = select(
+        DonationItem.item_name, DonationItem.category,
+        func.sum(DonationItem.quantity).label('quantity'), func.count(DonationItem.id).label('lines'),
+    )
+    if name:
+        query = query.where(DonationItem.item_name == name)
+    if start:
+        query = query.where(DonationItem.date >= datetime.combine(start, time.min))
+    if end:
+        query = query.where(DonationItem.date < datetime.combine(end + timedelta(days=1), time.min))
+    query = query.group_by(DonationItem.item_name, DonationItem.category).order_by(
+        func.sum(DonationItem.quantity).desc(), DonationItem.item_name)
+    return [dict(row) for row in db.session.execute(query).mappings()]
@@ -0,0 +1,122 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from flask import current_app
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from app.utils import replicas
+
+# Async views for the ASGI front (app/asgi.py). A few read-heavy GETs have an
+# ``async def`` twin next to their sync view, registered with ``async_route``.
+# Under an ASGI server they run on the event loop with an AsyncSession, so a
+# request waiting on the database holds no thread. The sync views stay the
+# only ones used under `flask run` or any WSGI server.
+
+# endpoint: (async view, tables it may read from a replica, or None)
+ASYNC_VIEWS = {}
+
+# Async drivers for the backends of the sync URLs
+_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_route(bp, view):
+    """Answer ``view`` of ``bp`` with the decorated coroutine under ASGI.
+
+    The coroutine gets the request's ``AsyncSession`` first, then the URL
+    arguments. If ``view`` is ``@read_replica`` the session may be on a
+    replica too, under the same rules.
+    """
+    def decorator(async_view):
+        ASYNC_VIEWS[f'{bp.name}.{view.__name__}'] = (async_view, getattr(view, 'replica_tables', None))
+        return async_view
+    return decorator
+
+
+def async_url(url):
+    """``url`` with the async driver for its backend (aiosqlite, asyncpg)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in _DRIVERS:
+        raise ValueError(f"No async driver for '{backend}' databases, set ASYNC_DATABASE_URL")
+    return url.set(drivername=_DRIVERS[backend])
+
+
+def init_app(app):
+    """Create async engines for the primary and each replica, with the same pool
+    options and pragmas as the sync ones. Only the ASGI front calls this."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.utils.engine import install_pragmas
+
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+    def create(url, read_only=False):
+        engine = create_async_engine(url, **options)
+        install_pragmas(app, engine.sync_engine, read_only=read_only)
+        return engine
+
+    # The sync engine's URL, after Flask-SQLAlchemy put relative SQLite paths in instance/
+    with app.app_context():
+        primary = app.config['ASYNC_DATABASE_URL'] or async_url(app.extensions['sqlalchemy'].engine.url)
+    app.extensions['async_engines'] = {
+        'primary': create(primary),
+        'replicas': {key: create(async_url(engine.url), read_only=True)
+                     for key, engine in app.extensions['replica_engines'].items()},
+    }
+
+
+async def dispose(app):
+    engines = app.extensions.get('async_engines')
+    if engines:
+        for engine in (engines['primary'], *engines['replicas'].values()):
+            await engine.dispose()
+
+
+@asynccontextmanager
+async def request_session(replica_tables=None):
+    """An ``AsyncSession`` for one request, on a replica if it may read
+    ``replica_tables`` from one (see ``replicas.use_replica``)."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    app = current_app
+    engines = app.extensions['async_engines']
+    session = None
+    keys = replicas.candidates(engines['replicas']) if replica_tables else []
+    if keys:
+        async with engines['primary'].connect() as connection:
+            required = await connection.run_sync(replicas.pinned_revisions, replicas.principal(), replica_tables)
+    for key in keys:
+        session = AsyncSession(engines['replicas'][key], expire_on_commit=False)
+        try:
+            if required is None:
+                await session.connection()
+                break
+            if replicas.caught_up(required, await session.run_sync(replicas.revisions, replica_tables)):
+                break
+            app.logger.debug('Replica %s is behind the primary, skipping it', key)
+        except DBAPIError:
+            replicas.replica_health.mark_down(key, app.config['REPLICA_RETRY'])
+            app.logger.warning('Replica %s is unavailable, reading from the primary', key)
+        await session.close()
+        session = None
+    if session is None:
+        session = AsyncSession(engines['primary'], expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def jwt_required_async(view):
+    """``jwt_required()`` for async views.
+
+    The check runs in a thread because the revocation list syncs from the
+    database now and then. The request context goes with it.
+    """
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        await asyncio.to_thread(verify_jwt_in_request)
+        return await view(*args, **kwargs)
+    return wrapper
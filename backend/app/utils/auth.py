@@ -5,4 +5,10 @@ def generate_token(identity):
     # Ensure the identity is explicitly converted to string
     # This fixes the "Subject must be a string" error
     str_identity = str(identity)
-    return create_access_token(identity=str_identity, expires_delta=timedelta(days=1))
\ No newline at end of file
+    return create_access_token(identity=str_identity, expires_delta=timedelta(days=1))
+
+
+def is_token_revoked(jwt_payload):
+    # In-memory lookup; see app.utils.revocation
+    from app.utils.revocation import revoked_tokens
+    return revoked_tokens.is_revoked(jwt_payload['jti'], jwt_payload['exp'])
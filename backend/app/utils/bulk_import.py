@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import Orphan, Volunteer, Inventory, InventoryLog
+from app.utils.stats import apply_deltas
+from app.utils.critical_stock import critical_stock
+from app.utils.search import index_documents
+
+FORMATS = ('csv', 'ndjson')
+
+
+class Field:
+    def __init__(self, name, parse=str, required=False, default=None, kind='text'):
+        self.name = name
+        self.parse = parse
+        self.required = required
+        self.default = default
+        self.kind = kind
+
+
+class ImportSpec:
+    """How to validate and insert one resource. ``unique`` lists the columns that must not repeat.
+
+    ``after_insert(rows)`` runs in the same transaction, with each row's new ``id`` filled in.
+    """
+
+    def __init__(self, model, fields, unique=(), counter=None, after_insert=None):
+        self.model = model
+        self.fields = fields
+        self.unique = unique
+        self.counter = counter
+        self.after_insert = after_insert
+
+
+def _non_negative_int(value):
+    value = int(value)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+def _indexer(kind):
+    # Bulk inserts skip the flush hook that normally keeps search_index in step
+    return lambda rows: index_documents(db.session.connection(), kind, rows)
+
+
+def _after_inventory_insert(rows):
+    critical_stock.touch(db.session, names=[row['item_name'] for row in rows])
+    db.session.execute(insert(InventoryLog), [
+        {
+            'item_name': row['item_name'],
+            'category': row['category'],
+            'action': 'Added',
+            'quantity': row['quantity'],
+            'quantity_changed': row['quantity'],
+            'remarks': 'Bulk import',
+        }
+        for row in rows
+    ])
+
+
+SPECS = {
+    'orphans': ImportSpec(Orphan, [
+        Field('name', required=True),
+        Field('age', _non_negative_int, required=True, kind='non-negative integer'),
+        Field('gender', required=True),
+        Field('admission_date', datetime.fromisoformat, default=datetime.utcnow, kind='ISO date'),
+        Field('background'),
+        Field('health_status'),
+        Field('education_status'),
+    ], counter='orphans', after_insert=_indexer('orphans')),
+    'volunteers': ImportSpec(Volunteer, [
+        Field('name', required=True),
+        Field('age', _non_negative_int, required=True, kind='non-negative integer'),
+        Field('contact', required=True),
+        Field('email', required=True),
+        Field('address'),
+        Field('join_date', datetime.fromisoformat, default=datetime.utcnow, kind='ISO date'),
+    ], unique=('email',), counter='volunteers', after_insert=_indexer('volunteers')),
+    'inventory': ImportSpec(Inventory, [
+        Field('item_name', required=True),
+        Field('category', required=True),
+        Field('quantity', _non_negative_int, default=0, kind='non-negative integer'),
+        Field('critical_level', _non_negative_int, default=10, kind='non-negative integer'),
+    ], unique=('item_name', 'category'), after_insert=_after_inventory_insert),
+}
+
+
+def parse_rows(stream, fmt):
+    """Yield (row number, dict) from a binary CSV or NDJSON stream, one line at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None
+            continue
+        yield number, row if isinstance(row, dict) else None
+
+
+def _clean(spec, raw):
+    if raw is None:
+        raise ValueError('Row is not a JSON object')
+
+    row = {}
+    for field in spec.fields:
+        value = raw.get(field.name)
+        if value is None or value == '':
+            if field.required:
+                raise ValueError(f"'{field.name}' is required")
+            row[field.name] = field.default() if callable(field.default) else field.default
+            continue
+        try:
+            row[field.name] = field.parse(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{field.name}' must be a {field.kind}")
+    return row
+
+
+def _existing_keys(spec, keys):
+    columns = [getattr(spec.model, name) for name in spec.unique]
+    if len(columns) == 1:
+        condition = columns[0].in_([key[0] for key in keys])
+    else:
+        condition = tuple_(*columns).in_(keys)
+    return set(db.session.execute(select(*columns).where(condition)).all())
+
+
+def _insert_chunk(spec, chunk, report):
+    if spec.unique:
+        existing = _existing_keys(spec, [key for _, _, key in chunk])
+        for number, _, key in chunk:
+            if key in existing:
+                report.error(number, f"Already exists: {', '.join(map(str, key))}")
+        chunk = [entry for entry in chunk if entry[2] not in existing]
+    if not chunk:
+        return
+
+    try:
+        _insert_rows(spec, [row for _, row, _ in chunk])
+        db.session.commit()
+        report.inserted += len(chunk)
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    # One bad row fails the whole statement: retry row by row, each in a
+    # SAVEPOINT, so the others still go in and every failure gets its own error
+    for number, row, _ in chunk:
+        try:
+            with db.session.begin_nested():
+                _insert_rows(spec, [row])
+        except SQLAlchemyError as e:
+            report.error(number, str(e.orig) if getattr(e, 'orig', None) else str(e))
+        else:
+            report.inserted += 1
+    db.session.commit()
+
+
+def _insert_rows(spec, rows):
+    ids = db.session.execute(
+        insert(spec.model).returning(spec.model.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    for row, row_id in zip(rows, ids):
+        row['id'] = row_id
+    if spec.after_insert:
+        spec.after_insert(rows)
+    if spec.counter:
+        # Bulk inserts skip the flush hook that normally keeps the counters
+        apply_deltas(db.session.connection(), {spec.counter: len(rows)}, {})
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'error': message})
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def import_rows(spec, rows, batch_size=None, max_errors=None):
+    """Validate and insert (row number, dict) pairs in chunks of ``batch_size``, one commit per chunk."""
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    report = ImportReport(max_errors or current_app.config.get('IMPORT_MAX_ERRORS', 1000))
+    seen = set()
+    chunk = []
+
+    for number, raw in rows:
+        try:
+            row = _clean(spec, raw)
+        except ValueError as e:
+            report.error(number, str(e))
+            continue
+
+        key = tuple(row[name] for name in spec.unique)
+        if spec.unique:
+            if key in seen:
+                report.error(number, f"Duplicate in file: {', '.join(map(str, key))}")
+                continue
+            seen.add(key)
+
+        chunk.append((number, row, key))
+        if len(chunk) >= batch_size:
+            _insert_chunk(spec, chunk, report)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(spec, chunk, report)
+    return report
+
+
+def import_request(resource):
+    """Import the request body (or an uploaded ``file``) as CSV or NDJSON; returns (json, status)."""
+    upload = request.files.get('file')
+    fmt = request.args.get('format')
+    if not fmt:
+        source = (upload.filename if upload else request.mimetype) or ''
+        fmt = 'csv' if source.endswith('csv') else 'ndjson'
+    if fmt not in FORMATS:
+        return {"error": f"Unsupported format '{fmt}', use csv or ndjson"}, 400
+
+    stream = upload.stream if upload else request.stream
+    report = import_rows(SPECS[resource], parse_rows(stream, fmt),
+                         batch_size=request.args.get('batch_size', type=int))
+    return report.to_dict(), 201 if report.inserted and not report.failed else 200
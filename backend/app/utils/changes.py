@@ -0,0 +1,59 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tables written in the current transaction, collected per session
+_SESSION_KEY = 'changed_tables'
+_subscribers = []
+
+
+def subscribe(tables, callback):
+    """Call ``callback(changed)`` after every commit that wrote one of ``tables``."""
+    _subscribers.append((frozenset(tables), callback))
+
+
+def mark_changed(session, *tables):
+    session.info.setdefault(_SESSION_KEY, set()).update(tables)
+
+
+def pending(session):
+    """Tables written so far in ``session``'s transaction."""
+    return session.info.get(_SESSION_KEY, set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, '__table__')
+    }
+    if tables:
+        mark_changed(session, *tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statements(state):
+    # Bulk insert/update/delete statements bypass the unit of work
+    if state.is_insert or state.is_update or state.is_delete:
+        mark_changed(state.session, state.statement.table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify(session):
+    if session.in_nested_transaction():
+        return  # A SAVEPOINT released (begin_nested); wait for the real commit
+    changed = session.info.pop(_SESSION_KEY, None)
+    if not changed:
+        return
+    for tables, callback in _subscribers:
+        if tables & changed:
+            callback(changed)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard(session, previous_transaction):
+    # Only the outer transaction: a rolled back SAVEPOINT (begin_nested) leaves
+    # the writes made before it pending
+    if previous_transaction.parent is None:
+        session.info.pop(_SESSION_KEY, None)
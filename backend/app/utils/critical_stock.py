@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Inventory
+
+_SESSION_KEY = 'critical_stock_pending'
+
+
+def below_threshold():
+    # Matches the ix_inventory_stock_margin expression index
+    return (Inventory.quantity - Inventory.critical_level) <= 0
+
+
+class CriticalStock:
+    """Per-worker set of inventory items at or below their ``critical_level``.
+
+    Loaded once with an indexed query, then patched from the rows that write
+    paths touch (see ``touch``). Other workers' writes are picked up by a full
+    resync every ``CRITICAL_STOCK_RESYNC`` seconds. Threshold crossings are
+    pushed to subscribers, e.g. the SSE feed.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._items = None
+        self._synced_at = 0.0
+        self._subscribers = set()
+        # Bumped by every refresh; items it patched are remembered with the
+        # revision so a resync read before the patch does not undo it
+        self._revision = 0
+        self._patched = {}
+
+    def items(self):
+        """Critical items as dicts, ordered by category and name."""
+        self.sync()
+        with self._lock:
+            return sorted(self._items.values(), key=lambda item: (item['category'], item['item_name']))
+
+    def count(self):
+        self.sync()
+        return len(self._items)
+
+    def touch(self, session, ids=(), names=()):
+        """Re-check these items once ``session`` commits."""
+        pending = session.info.setdefault(_SESSION_KEY, (set(), set()))
+        pending[0].update(ids)
+        pending[1].update(names)
+
+    def refresh(self, ids=(), names=()):
+        if self._items is None or not (ids or names):
+            return  # Not loaded yet, the first read will see the new state anyway
+        conditions = []
+        if ids:
+            conditions.append(Inventory.id.in_(ids))
+        if names:
+            conditions.append(Inventory.item_name.in_(names))
+        with db.engine.connect() as connection:
+            rows = connection.execute(select(*_COLUMNS).where(db.or_(*conditions))).mappings().all()
+
+        seen = {row['id'] for row in rows}
+        with self._lock:
+            if self._items is None:
+                return
+            self._revision += 1
+            for row in rows:
+                self._apply(row['id'], dict(row) if row['quantity'] is not None
+                            and row['quantity'] <= row['critical_level'] else None)
+                self._patched[row['id']] = self._revision
+            for item_id in set(ids) - seen:
+                self._apply(item_id, None, removed=True)
+                self._patched[item_id] = self._revision
+
+    def resync(self):
+        with self._lock:
+            started = self._revision
+        with db.engine.connect() as connection:
+            rows = connection.execute(select(*_COLUMNS).where(below_threshold())).mappings().all()
+        fresh = {row['id']: dict(row) for row in rows}
+        with self._lock:
+            if self._items is not None:
+                # Items refreshed since the query started keep the newer state
+                for item_id, revision in self._patched.items():
+                    if revision > started:
+                        if item_id in self._items:
+                            fresh[item_id] = self._items[item_id]
+                        else:
+                            fresh.pop(item_id, None)
+                for item_id in set(self._items) | set(fresh):
+                    self._apply(item_id, fresh.get(item_id))
+            self._items = fresh
+            self._patched = {item_id: revision for item_id, revision in self._patched.items() if revision > started}
+            self._synced_at = time.monotonic()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def sync(self):
+        interval = current_app.config.get('CRITICAL_STOCK_RESYNC', 60)
+        if self._items is None or time.monotonic() - self._synced_at > interval:
+            self.resync()
+
+    def _apply(self, item_id, item, removed=False):
+        # Caller holds the lock
+        before = self._items.get(item_id)
+        if item:
+            self._items[item_id] = item
+            if not before:
+                self._publish('critical', item)
+            elif before['quantity'] != item['quantity'] or before['critical_level'] != item['critical_level']:
+                self._publish('updated', item)
+        elif before:
+            del self._items[item_id]
+            self._publish('removed' if removed else 'recovered', before)
+
+    def _publish(self, kind, item):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait({'type': kind, 'item': item})
+            except queue.Full:
+                # A stalled client must not block writers; it resyncs on reconnect
+                self._subscribers.discard(subscriber)
+
+
+_COLUMNS = (Inventory.id, Inventory.item_name, Inventory.category, Inventory.quantity, Inventory.critical_level)
+
+critical_stock = CriticalStock()
+
+
+@event.listens_for(Session, 'after_commit')
+def _refresh_touched(session):
+    if session.in_nested_transaction():
+        return  # Only a savepoint; other connections cannot see the rows yet
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        critical_stock.refresh(*pending)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_touched(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,103 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Named engine setups, picked with DB_ENGINE_PROFILE. 'auto' goes by the
+# database URL and 'none' keeps SQLAlchemy's defaults. Pool sizes are per
+# worker process.
+PROFILES = {
+    'sqlite-wal': {
+        'engine': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            # Seconds a connection waits for another writer before "database is locked"
+            'connect_args': {'timeout': 15},
+        },
+        # Readers no longer block the writer (or the reverse); NORMAL is still
+        # crash-safe in WAL mode, it only skips an fsync per commit
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 15000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64000,  # KiB, i.e. 64 MB per connection
+            'temp_store': 'MEMORY',
+        },
+    },
+    'postgres-pooled': {
+        'engine': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            # Drop connections the server or a proxy closed while they sat idle
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+        },
+        'pragmas': {},
+    },
+    'none': {'engine': {}, 'pragmas': {}},
+}
+
+# Environment overrides for the profile's numbers
+_ENV_OVERRIDES = {
+    'DB_POOL_SIZE': ('engine', 'pool_size'),
+    'DB_MAX_OVERFLOW': ('engine', 'max_overflow'),
+    'DB_POOL_TIMEOUT': ('engine', 'pool_timeout'),
+    'DB_POOL_RECYCLE': ('engine', 'pool_recycle'),
+    'SQLITE_MMAP_SIZE': ('pragmas', 'mmap_size'),
+    'SQLITE_CACHE_SIZE': ('pragmas', 'cache_size'),
+}
+
+
+def profile_name(name, uri):
+    if name != 'auto':
+        return name
+    backend = make_url(uri).get_backend_name()
+    return {'sqlite': 'sqlite-wal', 'postgresql': 'postgres-pooled'}.get(backend, 'none')
+
+
+def resolve(name, uri):
+    """(profile name, engine options, SQLite pragmas) for ``name`` and the database ``uri``."""
+    name = profile_name(name, uri)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{name}', use auto, {', '.join(PROFILES)}")
+    profile = {part: dict(values) for part, values in PROFILES[name].items()}
+    for variable, (part, option) in _ENV_OVERRIDES.items():
+        if os.environ.get(variable) and option in profile[part]:
+            profile[part][option] = int(os.environ[variable])
+
+    if make_url(uri).get_backend_name() == 'sqlite' and make_url(uri).database in (None, '', ':memory:'):
+        # In-memory databases use a single-connection pool and have no journal
+        profile = {'engine': {}, 'pragmas': {}}
+    return name, profile['engine'], profile['pragmas']
+
+
+def apply_profile(app):
+    """Put the profile's pool options into SQLALCHEMY_ENGINE_OPTIONS; call before ``db.init_app``."""
+    name, options, pragmas = resolve(app.config['DB_ENGINE_PROFILE'], app.config['SQLALCHEMY_DATABASE_URI'])
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS win over the profile
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    app.config['DB_ENGINE_PROFILE'] = name
+    app.config['SQLITE_PRAGMAS'] = pragmas
+
+
+def install_pragmas(app, engine, read_only=False):
+    """Run the profile's PRAGMAs on every new SQLite connection of ``engine``.
+
+    A ``read_only`` engine (e.g. a replica opened with mode=ro) leaves the
+    journal mode to whoever writes the file.
+    """
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+    if read_only:
+        pragmas.pop('journal_mode', None)
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
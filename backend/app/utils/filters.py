@@ -0,0 +1,73 @@
+import operator
+from datetime import datetime
+
+from flask import request, jsonify, make_response, abort
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+# ?field=value, ?field__op=value; 'in' takes a comma separated list
+OPERATORS = {
+    'eq': operator.eq,
+    # NULLs count as "not equal", e.g. health_status__ne=Healthy keeps unknowns
+    'ne': lambda column, value: column.is_distinct_from(value),
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'in': lambda column, values: column.in_(values),
+}
+
+# Query parameters that belong to pagination, projection or export. 'page' and
+# 'per_page' come from clients of the old offset pagination and are ignored.
+RESERVED = {'limit', 'per_page', 'page', 'after', 'fields', 'sort', 'format'}
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({"error": message}), 400))
+
+
+def _parse(column, raw):
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(raw)
+    if isinstance(column.type, Boolean):
+        if raw.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(raw)
+        return raw.lower() in ('true', '1')
+    if isinstance(column.type, Integer):
+        return int(raw)
+    if isinstance(column.type, Float):
+        return float(raw)
+    return raw
+
+
+def list_options(model, default_sort, descending=False):
+    """Filters and sort order for a list route, from the query string.
+
+    Only ``model.filter_fields`` can be filtered and only ``model.sort_fields``
+    sorted on (``?sort=name`` or ``?sort=-name``); anything else is a 400.
+    Returns (conditions, sort columns, descending) ready for ``paginate``;
+    the id is always the last sort column so keyset cursors stay unique.
+    """
+    conditions = []
+    for param, raw in request.args.items(multi=True):
+        if param in RESERVED:
+            continue
+        name, _, op = param.partition('__')
+        op = op or 'eq'
+        if name not in model.filter_fields or op not in OPERATORS:
+            _bad_request(f"Unsupported filter '{param}'")
+
+        column = getattr(model, name)
+        try:
+            value = [_parse(column, v) for v in raw.split(',')] if op == 'in' else _parse(column, raw)
+        except ValueError:
+            _bad_request(f"Invalid value for '{param}'")
+        conditions.append(OPERATORS[op](column, value))
+
+    sort = request.args.get('sort')
+    if not sort:
+        return conditions, default_sort, descending
+
+    name = sort.lstrip('-')
+    if name not in model.sort_fields:
+        _bad_request(f"Cannot sort on '{name}', use one of: {', '.join(model.sort_fields)}")
+    return conditions, [getattr(model, name), model.id], sort.startswith('-')
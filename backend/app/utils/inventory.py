@@ -0,0 +1,168 @@
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, select, tuple_, update
+
+from app import db
+from app.models import DonationItem, Inventory, InventoryLog
+from app.utils.sql import dialect_insert, supports_upsert
+from app.utils.critical_stock import critical_stock
+
+GROCERY_ITEMS = ['rice', 'dal', 'milk', 'veggies']
+
+
+def guess_category(item_name):
+    # Categorize based on common sense
+    return 'Grocery' if item_name.lower() in GROCERY_ITEMS else 'Things'
+
+
+def _valid(items):
+    # Named items with a positive whole quantity (a bool is not one); anything
+    # else in the JSON is skipped
+    if not isinstance(items, list):
+        return []
+    return [item for item in items
+            if isinstance(item, dict) and item.get('item') and type(item.get('quantity')) is int
+            and item['quantity'] > 0]
+
+
+def _categories(items):
+    # Oldest row wins when a name exists under several categories, as with .first()
+    requested = {}
+    for item in items:
+        requested.setdefault(item['item'], item.get('category'))
+    existing = dict(db.session.execute(
+        select(Inventory.item_name, Inventory.category)
+        .where(Inventory.item_name.in_(requested))
+        .order_by(Inventory.id.desc())
+    ).all())
+    return {
+        name: existing.get(name) or requested[name] or guess_category(name)
+        for name in requested
+    }
+
+
+def _lines(items, categories):
+    """One donation_items row (without donation/date) per item, linked to its inventory row."""
+    pairs = {(item['item'], categories[item['item']]) for item in items}
+    ids = {
+        (name, category): item_id
+        for item_id, name, category in db.session.execute(
+            select(Inventory.id, Inventory.item_name, Inventory.category)
+            .where(tuple_(Inventory.item_name, Inventory.category).in_(pairs))
+        )
+    }
+    return [
+        {
+            'item_name': item['item'],
+            'category': categories[item['item']],
+            'quantity': item['quantity'],
+            'inventory_id': ids.get((item['item'], categories[item['item']])),
+        }
+        for item in items
+    ]
+
+
+def describe_items(items):
+    """The lines ``receive_items`` would record for ``items``, without touching stock."""
+    items = _valid(items)
+    return _lines(items, _categories(items)) if items else []
+
+
+def attach_items(donation, lines):
+    """Store ``lines`` (from receive_items/describe_items) as the donation's donation_items rows."""
+    donation.date = donation.date or datetime.utcnow()
+    donation.items = [DonationItem(date=donation.date, **line) for line in lines]
+
+
+def receive_items(items, remarks):
+    """Add donated ``items`` ([{'item', 'quantity', 'category'?}]) to stock in a fixed number of statements.
+
+    Existing items are resolved by name with one IN query, all quantities are
+    applied with one upsert and all log rows go out in one executemany. The
+    caller owns the transaction. Returns the lines for ``attach_items``.
+    """
+    items = _valid(items)
+    if not items:
+        return []
+
+    totals = {}
+    for item in items:
+        totals[item['item']] = totals.get(item['item'], 0) + item['quantity']
+    categories = _categories(items)
+
+    rows = [
+        {'item_name': name, 'category': categories[name], 'quantity': totals[name]}
+        for name in sorted(totals)
+    ]
+    _increment_stock(rows)
+    critical_stock.touch(db.session, names=totals)
+
+    db.session.execute(insert(InventoryLog), [
+        {
+            'item_name': item['item'],
+            'category': categories[item['item']],
+            'action': 'ADD',
+            'quantity': item['quantity'],
+            'quantity_changed': item['quantity'],
+            'remarks': remarks,
+        }
+        for item in items
+    ])
+    return _lines(items, categories)
+
+
+def deduct_stock(item_id, quantity):
+    """Take ``quantity`` off one item if, and only if, enough is left. Returns True on success.
+
+    The check and the subtraction are a single conditional UPDATE, so concurrent
+    deductions can never drive stock below zero or overwrite each other.
+    """
+    result = db.session.execute(
+        update(Inventory)
+        .where(Inventory.id == item_id, Inventory.quantity >= quantity)
+        .values(quantity=Inventory.quantity - quantity, version=Inventory.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    critical_stock.touch(db.session, ids=[item_id])
+    return result.rowcount == 1
+
+
+def deduct_stock_many(quantities):
+    """Deduct ``quantities`` ({item id: quantity}) all at once, or nothing at all. Returns True on success.
+
+    One UPDATE covers every item; if any of them is short, fewer rows match and
+    the caller must roll back.
+    """
+    wanted = case(quantities, value=Inventory.id)
+    result = db.session.execute(
+        update(Inventory)
+        .where(Inventory.id.in_(quantities), Inventory.quantity >= wanted)
+        .values(quantity=Inventory.quantity - wanted, version=Inventory.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    critical_stock.touch(db.session, ids=quantities)
+    return result.rowcount == len(quantities)
+
+
+def _increment_stock(rows):
+    bind = db.session.get_bind()
+    table = Inventory.__table__
+
+    if supports_upsert(bind):
+        stmt = dialect_insert(bind, table).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.item_name, table.c.category],
+            set_={'quantity': func.coalesce(table.c.quantity, 0) + stmt.excluded.quantity,
+                  'version': table.c.version + 1}
+        ))
+        return
+
+    for row in rows:
+        result = db.session.execute(
+            table.update()
+            .where(table.c.item_name == row['item_name'], table.c.category == row['category'])
+            .values(quantity=func.coalesce(table.c.quantity, 0) + row['quantity'],
+                    version=table.c.version + 1)
+        )
+        if not result.rowcount:
+            db.session.execute(table.insert().values(**row))
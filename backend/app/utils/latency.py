@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import deque
+
+from flask import g, request
+
+# Endpoints that hash a password, timed apart so a login spike shows up as
+# such instead of being averaged into every other request
+AUTH_ENDPOINTS = {'auth_routes.login', 'auth_routes.register', 'donor_routes.donor_login', 'donor_routes.register'}
+
+
+class LatencyWindow:
+    """Durations of the last ``size`` requests in one group, per worker."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+        self._count = 0
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def info(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+        if not samples:
+            return {'count': count}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {'count': count, 'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99), 'max_ms': round(samples[-1] * 1000, 1)}
+
+
+class RequestTimer:
+    """Request latency split into 'auth' (password hashing) and 'api' (everything else)."""
+
+    def __init__(self, size=1024):
+        self.groups = {'auth': LatencyWindow(size), 'api': LatencyWindow(size)}
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._stop)
+
+    @staticmethod
+    def _start():
+        g.request_started = time.perf_counter()
+
+    def _stop(self, response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            group = 'auth' if request.endpoint in AUTH_ENDPOINTS else 'api'
+            self.groups[group].add(time.perf_counter() - started)
+        return response
+
+    def info(self):
+        return {name: window.info() for name, window in self.groups.items()}
+
+
+request_timer = RequestTimer()
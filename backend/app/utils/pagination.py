@@ -0,0 +1,94 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import current_app, request, jsonify, make_response, abort
+from sqlalchemy import DateTime, tuple_
+
+from app import db
+
+
+class Page:
+    def __init__(self, items, next_cursor, limit):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+
+def encode_cursor(values):
+    # Cursor is the sort key of the last row on the page, opaque to clients
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) and v is not None else v
+            for col, v in zip(columns, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        abort(make_response(jsonify({"error": "Invalid pagination cursor"}), 400))
+
+
+def get_limit(param='limit'):
+    default = current_app.config.get('PAGE_SIZE_DEFAULT', 50)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', 500)
+    limit = request.args.get(param, default, type=int)
+    return max(1, min(limit, maximum))
+
+
+def paginate(stmt, columns, descending=False, limit=None):
+    """Keyset-paginate the ``select()`` ``stmt`` on ``columns`` (the last one must be unique, e.g. the id).
+
+    Reads ``after`` and ``limit`` from the query string. Each page is a single
+    range scan on the sort key instead of an OFFSET over everything before it.
+    Items are plain row mappings; ``stmt`` must select the ``columns``.
+    """
+    limit = limit or get_limit()
+    rows = db.session.execute(_page_query(stmt, columns, descending, limit)).mappings().all()
+    return _page(rows, columns, limit)
+
+
+async def paginate_async(session, stmt, columns, descending=False, limit=None):
+    """``paginate`` on an ``AsyncSession``."""
+    limit = limit or get_limit()
+    rows = (await session.execute(_page_query(stmt, columns, descending, limit))).mappings().all()
+    return _page(rows, columns, limit)
+
+
+def _page_query(stmt, columns, descending, limit):
+    after = request.args.get('after')
+    if after:
+        key = tuple_(*columns)
+        last = tuple_(*decode_cursor(after, columns))
+        stmt = stmt.where(key < last if descending else key > last)
+
+    ordering = [col.desc() if descending else col.asc() for col in columns]
+    return stmt.order_by(*ordering).limit(limit + 1)
+
+
+def _page(rows, columns, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][col.key] for col in columns])
+    return Page(rows, next_cursor, limit)
+
+
+def page_response(page, serialize=dict):
+    # Body stays a plain JSON list; the next page is advertised in the headers
+    response = jsonify([serialize(item) for item in page.items])
+    if page.next_cursor:
+        # Every value of repeated parameters, not just the first
+        args = request.args.to_dict(flat=False)
+        args.update(after=[page.next_cursor], limit=[page.limit])
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args, doseq=True)}>; rel="next"'
+    return response
@@ -0,0 +1,275 @@
+import hashlib
+import hmac
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from flask_bcrypt import Bcrypt
+from sqlalchemy import delete, select, update
+
+from app import db
+
+log = logging.getLogger(__name__)
+
+# bcrypt runs in a small per-worker thread pool instead of the request thread,
+# so a login spike can only ever use PASSWORD_HASH_WORKERS cores (bcrypt
+# releases the GIL while it hashes). Requests beyond what the pool can clear in
+# PASSWORD_HASH_MAX_WAIT seconds are turned away with a 503.
+
+# Defaults only (prefix 2b); the cost is always passed explicitly
+_bcrypt = Bcrypt()
+
+
+def _hash(password, rounds):
+    return _bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def _check(pw_hash, password):
+    return _bcrypt.check_password_hash(pw_hash, password)
+
+
+def _timed(fn, *args):
+    # Runs in the pool; the time excludes waiting in the queue
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+class HasherBusy(Exception):
+    """Too much hashing queued already; answered with 503 and Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Password hashing is saturated, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Per-worker front to the hashing pool.
+
+    ``max_queue`` bounds the jobs in flight from this worker. Below that,
+    admission is adaptive: the expected wait (jobs ahead per pool thread
+    times the recent average job time) must stay under ``max_wait``, so the
+    limit tightens by itself when hashes get slower, e.g. on a busy host.
+    ``workers=0`` hashes in the calling thread, unbounded.
+    """
+
+    def __init__(self, workers, max_queue, max_wait):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._in_flight = 0
+        self._job_time = 0.25  # Moving average in seconds; starts at a typical cost-12 hash
+        self._stats = Counter()
+
+    def _executor(self):
+        # A pool created before a fork (e.g. gunicorn --preload) has no threads in the child
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+            self._pid = os.getpid()
+        return self._pool
+
+    def _expected_wait(self, in_flight):
+        return (in_flight // max(self.workers, 1) + 1) * self._job_time
+
+    def run(self, fn, *args):
+        if not self.workers:
+            result, elapsed = _timed(fn, *args)
+            self._record(elapsed)
+            return result
+
+        with self._lock:
+            wait = self._expected_wait(self._in_flight)
+            if self._in_flight >= self.max_queue or wait > self.max_wait:
+                self._stats['rejected'] += 1
+                raise HasherBusy(max(1, math.ceil(wait)))
+            self._in_flight += 1
+            pool = self._executor()
+        try:
+            result, elapsed = pool.submit(_timed, fn, *args).result()
+            self._record(elapsed)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _record(self, elapsed):
+        with self._lock:
+            self._job_time = 0.8 * self._job_time + 0.2 * elapsed
+            self._stats['completed'] += 1
+
+    def info(self):
+        with self._lock:
+            return {'workers': self.workers, 'max_queue': self.max_queue, 'in_flight': self._in_flight,
+                    'job_ms': round(self._job_time * 1000, 1),
+                    'expected_wait': round(self._expected_wait(self._in_flight), 3),
+                    'completed': self._stats['completed'], 'rejected': self._stats['rejected']}
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def get_hasher():
+    """The app's hasher, created on first use in each worker."""
+    extensions = current_app.extensions
+    if 'password_hasher' not in extensions:
+        config = current_app.config
+        extensions.setdefault('password_hasher', PasswordHasher(
+            config['PASSWORD_HASH_WORKERS'], config['PASSWORD_HASH_QUEUE'], config['PASSWORD_HASH_MAX_WAIT']
+        ))
+    return extensions['password_hasher']
+
+
+def hash_password(password):
+    """A bcrypt hash of ``password`` at the configured cost (BCRYPT_LOG_ROUNDS)."""
+    if not has_app_context():
+        return _hash(password, _bcrypt._log_rounds)
+    return get_hasher().run(_hash, password, current_app.config['BCRYPT_LOG_ROUNDS'])
+
+
+def check_password(pw_hash, password):
+    if not has_app_context():
+        return _check(pw_hash, password)
+    return get_hasher().run(_check, pw_hash, password)
+
+
+def hash_cost(pw_hash):
+    """The bcrypt cost a hash was made with ('$2b$12$...' -> 12)."""
+    return int(pw_hash.split('$')[2])
+
+
+def needs_rehash(pw_hash):
+    return hash_cost(pw_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
+
+
+def verify_password(account, password):
+    """Check ``password`` against a User/Donor. Hashes made at another cost than
+    BCRYPT_LOG_ROUNDS are replaced in the background once it matches."""
+    if not check_password(account.password_hash, password):
+        return False
+    if needs_rehash(account.password_hash):
+        threading.Thread(
+            target=_rehash, daemon=True,
+            args=(current_app._get_current_object(), type(account), account.id, account.password_hash, password)
+        ).start()
+    return True
+
+
+def _rehash(app, model, account_id, old_hash, password):
+    with app.app_context():
+        try:
+            new_hash = hash_password(password)
+        except HasherBusy:
+            return  # Next login tries again
+        try:
+            # Only if the password was not changed in the meantime
+            db.session.execute(
+                update(model).where(model.id == account_id, model.password_hash == old_hash)
+                .values(password_hash=new_hash)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            log.exception('Rehashing the password of %s %s failed', model.__name__, account_id)
+        finally:
+            db.session.remove()
+
+
+# Device keys: after a full bcrypt check, a client that asks for one
+# (remember_device) gets a random key. For LOGIN_DEVICE_KEY_TTL seconds that
+# client's logins still send the password, but it is checked against an HMAC
+# keyed by the device key instead of bcrypt. Only the key's SHA-256 is stored
+# (device_keys), so the HMAC cannot be attacked offline without the key. The
+# row also fingerprints the account's password hash, so a password change
+# revokes every key issued before it.
+
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def _password_mac(key, password):
+    return hmac.new(key.encode('utf-8'), password.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def prune_device_keys(session):
+    """Delete expired device keys. Returns how many."""
+    from app.models import DeviceKey  # app.models imports this module
+
+    return session.execute(delete(DeviceKey).where(DeviceKey.expires_at <= datetime.utcnow())).rowcount
+
+
+def issue_device_key(account, password):
+    """A new device key for ``account``, or None when LOGIN_DEVICE_KEY_TTL is 0."""
+    from app.models import DeviceKey
+
+    ttl = current_app.config['LOGIN_DEVICE_KEY_TTL']
+    if not ttl:
+        return None
+    key = secrets.token_urlsafe(32)
+    # Keys of every account expire here too, so the table stays small
+    prune_device_keys(db.session)
+    db.session.add(DeviceKey(
+        account_type=type(account).__name__, account_id=account.id, key_hash=_digest(key),
+        hash_version=_digest(account.password_hash), password_mac=_password_mac(key, password),
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+    ))
+    db.session.commit()
+    return key
+
+
+def check_device_key(account, key, password):
+    """True if ``key`` is a live device key of ``account`` under its current
+    password, and ``password`` is that password."""
+    from app.models import DeviceKey
+
+    if not (current_app.config['LOGIN_DEVICE_KEY_TTL'] and isinstance(key, str) and key):
+        return False
+    found = db.session.execute(
+        select(DeviceKey.account_type, DeviceKey.account_id, DeviceKey.hash_version, DeviceKey.password_mac)
+        .where(DeviceKey.key_hash == _digest(key), DeviceKey.expires_at > datetime.utcnow())
+    ).first()
+    return (found is not None and found.account_type == type(account).__name__
+            and found.account_id == account.id
+            and hmac.compare_digest(found.hash_version, _digest(account.password_hash))
+            and hmac.compare_digest(found.password_mac, _password_mac(key, password)))
+
+
+def login_check(account, password, device_key=None, remember=False):
+    """Verify a login. Returns (ok, device key for the client).
+
+    The password is always required. With a live ``device_key`` it is checked
+    against the key's HMAC and the same key is handed back, so it expires on
+    schedule. Otherwise bcrypt checks it, and a new key is issued only if the
+    client asked to be ``remember``-ed.
+    """
+    if not isinstance(password, str) or not password:
+        return False, None
+    if check_device_key(account, device_key, password):
+        return True, device_key
+    if not account.check_password(password):
+        return False, None
+    return True, issue_device_key(account, password) if remember else None
+
+
+def calibrate(budget_ms, low=4, high=16):
+    """The highest bcrypt cost whose hash fits in ``budget_ms`` on this host, with the timings measured."""
+    timings = {}
+    for rounds in range(low, high + 1):
+        started = time.perf_counter()
+        _hash('calibration', rounds)
+        timings[rounds] = (time.perf_counter() - started) * 1000
+        if timings[rounds] > budget_ms:
+            break
+    fitting = [rounds for rounds, ms in timings.items() if ms <= budget_ms]
+    return (max(fitting) if fitting else low), timings
@@ -0,0 +1,123 @@
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Donor, User
+from app.utils.response_cache import LRUCache
+
+_SESSION_KEY = 'principals_changed'
+
+# kind: (model, fields kept)
+_KINDS = {
+    'donor': (Donor, Donor.serialize_fields),
+    'user': (User, ('id', 'name', 'email', 'created_at')),
+}
+_MODELS = {model: kind for kind, (model, _) in _KINDS.items()}
+
+
+class Principal:
+    """Read-only copy of the signed-in User/Donor row, shared between requests.
+
+    Enough for handlers that only read the account; ones that change it must
+    load the ORM object.
+    """
+
+    def __init__(self, fields, values):
+        self._fields = fields
+        self.__dict__.update(values)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+
+def _cache():
+    extensions = current_app.extensions
+    if 'principal_cache' not in extensions:
+        config = current_app.config
+        extensions.setdefault('principal_cache', LRUCache(config['PRINCIPAL_CACHE_SIZE'], config['PRINCIPAL_CACHE_TTL']))
+    return extensions['principal_cache']
+
+
+def _lookup(kind):
+    # Request scoped first, then the per-worker LRU: (cache key, boxed Principal or None)
+    loaded = g.setdefault('principals', {})
+    if kind in loaded:
+        return None, (loaded[kind],)
+    claims = get_jwt()
+    key = (kind, int(claims['sub']), claims.get('iat'))
+    return key, _cache().get(key)
+
+
+def _query(kind, account_id):
+    model, fields = _KINDS[kind]
+    return select(*[getattr(model, name) for name in fields]).where(model.id == account_id)
+
+
+def _remember(kind, key, found):
+    if key is not None:
+        # Boxed so that a missing account is cached too
+        _cache().set(key, found, {f'{kind}:{key[1]}'})
+    g.principals[kind] = found[0]
+    return found[0]
+
+
+def _box(kind, row):
+    # Deactivated donors count as missing
+    if row is None or row.get('is_active') is False:
+        return (None,)
+    return (Principal(_KINDS[kind][1], row),)
+
+
+def _load(kind):
+    key, found = _lookup(kind)
+    if found is None:
+        found = _box(kind, db.session.execute(_query(kind, key[1])).mappings().first())
+    return _remember(kind, key, found)
+
+
+async def _load_async(kind, session):
+    key, found = _lookup(kind)
+    if found is None:
+        found = _box(kind, (await session.execute(_query(kind, key[1]))).mappings().first())
+    return _remember(kind, key, found)
+
+
+def current_donor():
+    """The Donor of the request's JWT (a ``Principal``), or None if missing or deactivated."""
+    return _load('donor')
+
+
+def current_user():
+    """The staff User of the request's JWT (a ``Principal``), or None."""
+    return _load('user')
+
+
+async def current_user_async(session):
+    """``current_user`` for async views, loading through ``session``."""
+    return await _load_async('user', session)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed(session, flush_context):
+    changed = session.info.setdefault(_SESSION_KEY, set())
+    for obj in (*session.dirty, *session.deleted):
+        kind = _MODELS.get(type(obj))
+        if kind:
+            changed.add(f'{kind}:{obj.id}')
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    if session.in_nested_transaction():
+        return
+    changed = session.info.pop(_SESSION_KEY, None)
+    if changed and has_app_context():
+        _cache().invalidate(changed)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,225 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, has_request_context, request
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_sqlalchemy.session import Session
+from jwt.exceptions import PyJWTError
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+# Read replicas: handlers marked @read_replica(*tables) run their queries on
+# one of the DATABASE_REPLICA_URLS binds. Flushes and INSERT/UPDATE/DELETE
+# statements always go to the primary.
+#
+# Read-your-writes: a commit that writes content tables pins its principal
+# (JWT subject, else client address) in the primary's replica_pins table for
+# REPLICA_STICKY_SECONDS, in the same transaction. While pinned, a client only
+# reads from a replica whose table_revisions have caught up with the primary's
+# for the tables the handler reads. Everyone else reads from any replica.
+#
+# Locally, two SQLite files will do: DATABASE_REPLICA_URLS=
+# sqlite:////abs/path/replica.db?mode=ro&uri=true (read-only, so a missing file
+# counts as unavailable instead of being created), refreshed from the primary
+# with `flask replicas sync`.
+
+_INFO_KEY = 'replica'
+
+
+class RoutingSession(Session):
+    """Session whose reads go to the replica chosen for the request, if any."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(_INFO_KEY)
+        if replica is not None and bind is None and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_app(app):
+    """Create the replica engines.
+
+    The engines are not Flask-SQLAlchemy binds, so create_all() and migrations
+    never touch them. They get the primary's engine options and pragmas.
+    """
+    from app.utils.engine import install_pragmas
+
+    engines = {}
+    for i, url in enumerate(app.config['DATABASE_REPLICA_URLS']):
+        engines[f'replica_{i}'] = create_engine(url, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        install_pragmas(app, engines[f'replica_{i}'], read_only=True)
+    app.extensions['replica_engines'] = engines
+
+
+def principal():
+    """Who the request is from: the subject of a valid JWT, else the client address."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        try:
+            return f"sub:{decode_token(header.removeprefix('Bearer '))['sub']}"
+        except (JWTExtendedException, PyJWTError):
+            pass
+    return f'addr:{request.remote_addr}'
+
+
+def revisions(connection, tables):
+    """``{table: revision}`` of ``tables`` as seen by ``connection`` (a Connection or Session)."""
+    from app.models import TableRevision
+
+    query = select(TableRevision.table_name, TableRevision.revision).where(TableRevision.table_name.in_(tables))
+    return dict(connection.execute(query).all())
+
+
+def pinned_revisions(connection, who, tables):
+    """None if ``who`` may read from any replica, else the primary's revisions of
+    ``tables`` that a replica must have caught up with."""
+    from app.models import ReplicaPin
+
+    until = connection.execute(select(ReplicaPin.until).where(ReplicaPin.principal == who)).scalar()
+    if until is None or until <= datetime.utcnow():
+        return None
+    return revisions(connection, tables)
+
+
+def caught_up(required, replica):
+    """True if the ``replica`` revisions include every commit counted in ``required``."""
+    return all(replica.get(table, 0) >= revision for table, revision in required.items())
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _pin_writer(session):
+    if session.in_nested_transaction():
+        return
+    app = current_app
+    seconds = app.config['REPLICA_STICKY_SECONDS'] if has_request_context() else 0
+    if not (app.config['DATABASE_REPLICA_URLS'] and seconds):
+        return
+    from app.models import ReplicaPin
+    from app.utils import changes
+    from app.utils.revisions import CONTENT_TABLES
+    from app.utils.sql import dialect_insert, supports_upsert
+
+    session.flush()
+    if not changes.pending(session) & CONTENT_TABLES:
+        return
+    now = datetime.utcnow()
+    row = {'principal': principal(), 'until': now + timedelta(seconds=seconds)}
+    table = ReplicaPin.__table__
+    # Same transaction as the writes, so the pin is visible as soon as they are
+    connection = session.connection(bind_arguments={'clause': table.insert()})
+    connection.execute(delete(table).where(table.c.until < now))
+    if supports_upsert(connection):
+        stmt = dialect_insert(connection, table).values(row)
+        connection.execute(stmt.on_conflict_do_update(index_elements=[table.c.principal],
+                                                      set_={'until': stmt.excluded.until}))
+    elif not connection.execute(table.update().where(table.c.principal == row['principal'])
+                                .values(until=row['until'])).rowcount:
+        connection.execute(table.insert().values(**row))
+
+
+class _Health:
+    # Replicas that failed to connect are skipped for REPLICA_RETRY seconds, per worker
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+
+    def up(self, keys):
+        now = time.monotonic()
+        return [key for key in keys if self._down_until.get(key, 0) <= now]
+
+    def mark_down(self, key, seconds):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + seconds
+
+
+replica_health = _Health()
+
+
+def candidates(engines):
+    """Keys of ``engines`` this request may read from, in random order."""
+    if not engines:
+        return []
+    keys = replica_health.up(engines)
+    random.shuffle(keys)
+    return keys
+
+
+def use_replica(tables):
+    """Route this request's reads of ``tables`` to a reachable replica, one that
+    is caught up if the client is pinned. Returns its bind key, or None for the primary."""
+    app = current_app
+    engines = app.extensions['replica_engines']
+    db = app.extensions['sqlalchemy']
+    keys = candidates(engines)
+    if not keys:
+        return None
+    with db.engine.connect() as connection:
+        required = pinned_revisions(connection, principal(), tables)
+    for key in keys:
+        engine = engines[key]
+        try:
+            # Checked out now and held by the session for the rest of the request
+            connection = db.session.connection(bind_arguments={'bind': engine})
+            fresh = required is None or caught_up(required, revisions(connection, tables))
+        except DBAPIError:
+            db.session.rollback()
+            replica_health.mark_down(key, app.config['REPLICA_RETRY'])
+            app.logger.warning('Replica %s is unavailable, reading from the primary', key)
+            continue
+        if not fresh:
+            db.session.rollback()
+            app.logger.debug('Replica %s is behind the primary, skipping it', key)
+            continue
+        db.session.info[_INFO_KEY] = engine
+        return key
+    return None
+
+
+def read_replica(*tables):
+    """Mark a read-only handler that reads ``tables``: its queries may be answered by a replica.
+
+    Put it above decorators that query (``conditional``, ``jwt_required``).
+    """
+    from app.utils.revisions import tracked_tables
+
+    tables = tracked_tables(tables)
+    if not tables:
+        raise ValueError('read_replica needs the tables the handler reads')
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            use_replica(tables)
+            return view(*args, **kwargs)
+        # For the handler's async twin, see app.utils.async_db.async_route
+        wrapper.replica_tables = tables
+        return wrapper
+    return decorator
+
+
+def sync_sqlite_replicas(app):
+    """Copy the primary SQLite database over each SQLite replica file. Returns the paths written."""
+    import sqlite3
+
+    db = app.extensions['sqlalchemy']
+    primary = db.engine.url
+    if primary.get_backend_name() != 'sqlite':
+        raise RuntimeError('Only SQLite replicas can be synced locally')
+    written = []
+    for engine in app.extensions['replica_engines'].values():
+        if engine.url.get_backend_name() != 'sqlite':
+            continue
+        path = engine.url.database.removeprefix('file:')
+        source, target = sqlite3.connect(primary.database), sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        written.append(path)
+    return written
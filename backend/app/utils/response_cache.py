@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, has_app_context
+
+from app import db, models  # noqa: F401 (declares the tables subscribed to below)
+from app.utils import changes
+
+# Cached GET responses, tagged with the tables they were built from.
+#
+# Keys embed the table revisions (see app.utils.revisions), so a write in any
+# worker makes older entries unreachable straight away. Tag invalidation on
+# commit only frees them early instead of waiting for LRU/TTL eviction.
+
+
+class LRUCache:
+    """In-process cache bounded by entry count, with a TTL per entry."""
+
+    name = 'lru'
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._stats = Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[2]
+
+    def set(self, key, value, tags):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            stale = [key for key, (_, entry_tags, _) in self._entries.items() if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            return {'backend': self.name, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    **{name: self._stats[name] for name in _STATS}}
+
+
+class SQLiteCache:
+    """Cache in a SQLite file, shared by every worker on the host.
+
+    Reads are plain SELECTs, so cached responses never queue behind a writer.
+    What a read would have written (hit/miss counts, the entry's last access)
+    is kept per worker and saved by the worker's next write. Last access is only
+    refreshed once it is more than a quarter of the TTL old. Eviction past
+    ``max_entries`` is therefore approximately least-recently-used. The
+    counters live in the file too, so they cover all workers.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending_stats = Counter()
+        self._pending_access = {}  # key -> accessed_at
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT NOT NULL,
+                expires_at REAL NOT NULL, accessed_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at);
+            CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at);
+            CREATE TABLE IF NOT EXISTS entry_tags (tag TEXT NOT NULL, key TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_entry_tags_tag ON entry_tags (tag);
+            CREATE INDEX IF NOT EXISTS ix_entry_tags_key ON entry_tags (key);
+            CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _note(self, stat, key=None, accessed_at=None):
+        with self._lock:
+            self._pending_stats[stat] += 1
+            if key is not None:
+                self._pending_access[key] = accessed_at
+
+    def _save_pending(self, conn):
+        # Inside a write transaction: what this worker's reads left to record
+        with self._lock:
+            stats, self._pending_stats = self._pending_stats, Counter()
+            access, self._pending_access = self._pending_access, {}
+        for name, amount in stats.items():
+            self._count(conn, name, amount)
+        conn.executemany('UPDATE entries SET accessed_at = ? WHERE key = ? AND accessed_at < ?',
+                         [(at, key, at) for key, at in access.items()])
+
+    @staticmethod
+    def _count(conn, name, amount=1):
+        if amount:
+            conn.execute('INSERT INTO stats (name, value) VALUES (?, ?) '
+                         'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value', (name, amount))
+
+    @staticmethod
+    def _delete(conn, where, params):
+        keys = [row[0] for row in conn.execute(f'SELECT key FROM entries WHERE {where}', params)]
+        if keys:
+            marks = ','.join('?' * len(keys))
+            conn.execute(f'DELETE FROM entries WHERE key IN ({marks})', keys)
+            conn.execute(f'DELETE FROM entry_tags WHERE key IN ({marks})', keys)
+        return len(keys)
+
+    def get(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT body, headers, expires_at, accessed_at FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[2] < now:
+            # Expired rows are purged by the next set()
+            self._note('misses')
+            return None
+        stale_access = row[3] < now - self.ttl / 4
+        self._note('hits', key if stale_access else None, now)
+        return row[0], json.loads(row[1])
+
+    def set(self, key, value, tags):
+        body, headers = value
+        now = time.time()
+        with self._transaction() as conn:
+            self._save_pending(conn)
+            self._count(conn, 'expired', self._delete(conn, 'expires_at < ?', (now,)))
+            conn.execute('INSERT OR REPLACE INTO entries (key, body, headers, expires_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, body, json.dumps(headers), now + self.ttl, now))
+            conn.execute('DELETE FROM entry_tags WHERE key = ?', (key,))
+            conn.executemany('INSERT INTO entry_tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags])
+            excess = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+            if excess > 0:
+                evicted = self._delete(conn, 'key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)',
+                                       (excess,))
+                self._count(conn, 'evictions', evicted)
+
+    def invalidate(self, tags):
+        tags = list(tags)
+        marks = ','.join('?' * len(tags))
+        with self._transaction() as conn:
+            self._save_pending(conn)
+            removed = self._delete(conn, f'key IN (SELECT key FROM entry_tags WHERE tag IN ({marks}))', tags)
+            self._count(conn, 'invalidations', removed)
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM entry_tags')
+
+    def info(self):
+        with self._transaction() as conn:
+            self._save_pending(conn)
+            entries = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            stats = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+        return {'backend': self.name, 'entries': entries, 'max_entries': self.max_entries,
+                **{name: stats.get(name, 0) for name in _STATS}}
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE ... COMMIT around one cache operation
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+_STATS = ('hits', 'misses', 'evictions', 'expired', 'invalidations')
+
+
+def _create(config):
+    backend = config.get('RESPONSE_CACHE', 'lru')
+    size, ttl = config.get('RESPONSE_CACHE_SIZE', 1024), config.get('RESPONSE_CACHE_TTL', 300)
+    if backend == 'lru':
+        return LRUCache(size, ttl)
+    if backend == 'sqlite':
+        path = config.get('RESPONSE_CACHE_PATH') or os.path.join(tempfile.gettempdir(), 'orphan-response-cache.db')
+        return SQLiteCache(path, size, ttl)
+    if backend == 'none':
+        return None
+    raise ValueError(f"Unknown RESPONSE_CACHE backend '{backend}', use lru, sqlite or none")
+
+
+def get_cache():
+    """The app's response cache, or None when RESPONSE_CACHE is 'none'."""
+    extensions = current_app.extensions
+    if 'response_cache' not in extensions:
+        extensions.setdefault('response_cache', _create(current_app.config))
+    return extensions['response_cache']
+
+
+def _invalidate(changed):
+    if has_app_context():
+        cache = get_cache()
+        if cache is None:
+            return
+        try:
+            cache.invalidate(changed)
+        except sqlite3.Error:
+            # The writes are already committed, so don't fail the request. Their
+            # new revisions make the old entries unreachable anyway; they are
+            # only left for TTL or LRU eviction to free.
+            current_app.logger.warning('Response cache invalidation failed', exc_info=True)
+
+
+# Every write drops the entries built from the tables it touched
+changes.subscribe(db.metadata.tables.keys(), _invalidate)
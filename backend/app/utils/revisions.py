@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+from functools import wraps
+
+from flask import request, make_response, current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import TableRevision
+from app.utils import changes
+from app.utils.response_cache import get_cache
+from app.utils.sql import dialect_insert, supports_upsert
+
+# Tables API responses are built from; only their writes bump a revision.
+# Bookkeeping tables (revoked_tokens, device_keys, stats_counters,
+# donation_rollups, search_index) are written by logins, logouts and derived
+# totals, and would otherwise add a revision write to those commits and
+# change ETags of responses that do not depend on them.
+CONTENT_TABLES = frozenset({
+    'user', 'donors', 'orphans', 'volunteers', 'donations', 'donation_items',
+    'events', 'inventory', 'inventory_logs',
+})
+
+
+def bump(connection, tables):
+    """Add one to the revision of each of ``tables``."""
+    table = TableRevision.__table__
+    rows = [{'table_name': name, 'revision': 1} for name in sorted(tables)]
+
+    if supports_upsert(connection):
+        stmt = dialect_insert(connection, table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.table_name],
+            set_={'revision': table.c.revision + 1}
+        ))
+        return
+
+    for row in rows:
+        result = connection.execute(
+            table.update().where(table.c.table_name == row['table_name'])
+            .values(revision=table.c.revision + 1)
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+def tracked_tables(tables):
+    """``tables``, if they all keep revisions (are in CONTENT_TABLES)."""
+    untracked = set(tables) - CONTENT_TABLES
+    if untracked:
+        raise ValueError(f"No revisions are kept for {', '.join(sorted(untracked))}, see CONTENT_TABLES")
+    return tables
+
+
+def _revisions_query(tables):
+    return select(TableRevision.table_name, TableRevision.revision).where(TableRevision.table_name.in_(tables))
+
+
+def get_revisions(*tables):
+    found = dict(db.session.execute(_revisions_query(tables)).all())
+    return tuple(found.get(name, 0) for name in tables)
+
+
+async def get_revisions_async(session, *tables):
+    """``get_revisions`` on an ``AsyncSession``."""
+    found = dict((await session.execute(_revisions_query(tables))).all())
+    return tuple(found.get(name, 0) for name in tables)
+
+
+def conditional(*tables, vary=None, cache=False):
+    """Answer GETs with a strong ETag derived from the revisions of ``tables``.
+
+    A matching ``If-None-Match`` gets a 304 after one primary-key lookup, before
+    the view runs. The tag also covers the full path (query string included)
+    and ``vary()``, for responses that depend on more than the tables.
+
+    With ``cache`` the 200 responses are also kept in the response cache under
+    that tag, so other clients asking for the same page skip the view too.
+    """
+    tracked_tables(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = _etag(tables, get_revisions(*tables), vary)
+            store = get_cache() if cache else None
+            response = _stored_response(etag, store)
+            if response is None:
+                response = make_response(view(*args, **kwargs))
+                if not _keep(response, etag, store, tables):
+                    return response
+            return _tagged(response, etag)
+        return wrapper
+    return decorator
+
+
+def conditional_async(*tables, vary=None, cache=False):
+    """``conditional`` for async views, which take the ``AsyncSession`` first."""
+    tracked_tables(tables)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(session, *args, **kwargs):
+            etag = _etag(tables, await get_revisions_async(session, *tables), vary)
+            if cache:
+                # A store can block (SQLiteCache waits on the file's write lock),
+                # so its calls run in a thread, off the event loop
+                store, response = await asyncio.to_thread(_lookup, etag)
+            else:
+                store, response = None, _stored_response(etag, None)
+            if response is None:
+                response = make_response(await view(session, *args, **kwargs))
+                if store is not None:
+                    kept = await asyncio.to_thread(_keep, response, etag, store, tables)
+                else:
+                    kept = _keep(response, etag, None, tables)
+                if not kept:
+                    return response
+            return _tagged(response, etag)
+        return wrapper
+    return decorator
+
+
+def _etag(tables, revisions, vary):
+    # The database URL too: revision numbers are only unique within one database,
+    # and a SQLite response cache file can be shared by apps on different ones
+    key = (str(db.engine.url), tables, revisions, request.full_path, vary() if vary else None)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def _stored_response(etag, store):
+    # 304 for a matching If-None-Match, else the cached 200 if there is one
+    if request.if_none_match.contains(etag):
+        return make_response('', 304)
+    cached = store.get(etag) if store is not None else None
+    if cached is None:
+        return None
+    body, headers = cached
+    return current_app.response_class(body, headers=headers)
+
+
+def _lookup(etag):
+    store = get_cache()
+    return store, _stored_response(etag, store)
+
+
+def _keep(response, etag, store, tables):
+    # Only 200s are tagged and cached; anything else goes out as the view made it
+    if response.status_code != 200:
+        return False
+    if store is not None:
+        headers = [(k, v) for k, v in response.headers if k not in _UNCACHED_HEADERS]
+        store.set(etag, (response.get_data(), headers), tables)
+    return True
+
+
+def _tagged(response, etag):
+    response.set_etag(etag)
+    # Let browsers keep the body but always revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Set per response by conditional() itself
+_UNCACHED_HEADERS = {'Content-Length', 'ETag', 'Cache-Control'}
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_revisions(session):
+    if session.in_nested_transaction():
+        return  # Bumped once, when the outer transaction commits
+    # Flush first so writes still pending in the session are counted
+    session.flush()
+    tables = changes.pending(session) & CONTENT_TABLES
+    if tables:
+        # Same transaction as the writes, so a revision never lags committed data
+        bump(session.connection(), tables)
@@ -0,0 +1,94 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from app import db
+from app.models import RevokedToken
+from app.utils.sql import dialect_insert, supports_upsert
+
+# Seconds of token expiry covered by one bucket
+_BUCKET = 300
+
+
+def _utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class RevocationStore:
+    """Per-worker set of revoked token ids (JTIs), bucketed by token expiry.
+
+    A token's own ``exp`` names the one bucket it could be in, so a check is
+    a dict lookup plus a set lookup. Buckets whose tokens have all expired are
+    dropped whole. Every REVOCATION_SYNC seconds the live rows of the
+    revoked_tokens table (kept to unexpired tokens by pruning) are read again.
+    Picking up "ids above the last one seen" would miss rows whose transaction
+    committed after a higher id's, which PostgreSQL sequences allow.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # exp // _BUCKET -> set of jtis
+        self._synced_at = None
+
+    def is_revoked(self, jti, exp):
+        self.sync()
+        bucket = self._buckets.get(exp // _BUCKET)
+        return bucket is not None and jti in bucket
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._buckets.setdefault(exp // _BUCKET, set()).add(jti)
+
+    def sync(self):
+        interval = current_app.config.get('REVOCATION_SYNC', 2)
+        if self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+            return
+        with self._lock:
+            if self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+                return
+            now = time.time()
+            with db.engine.connect() as connection:
+                rows = connection.execute(
+                    select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > _utc(now))
+                ).all()
+
+            for jti, expires_at in rows:
+                exp = int(expires_at.replace(tzinfo=timezone.utc).timestamp())
+                self._buckets.setdefault(exp // _BUCKET, set()).add(jti)
+            # Expired tokens are rejected by their signature check already
+            for bucket in [b for b in self._buckets if (b + 1) * _BUCKET <= now]:
+                del self._buckets[bucket]
+            self._synced_at = time.monotonic()
+
+    def info(self):
+        with self._lock:
+            return {'buckets': len(self._buckets), 'revoked': sum(len(jtis) for jtis in self._buckets.values())}
+
+
+revoked_tokens = RevocationStore()
+
+
+def revoke(payload):
+    """Revoke the token with this decoded ``payload`` (needs jti and exp) for every worker."""
+    row = {'jti': payload['jti'], 'expires_at': _utc(payload['exp'])}
+    connection = db.session.connection()
+    if supports_upsert(connection):
+        # The same token may be logged out twice before this worker has seen the first
+        db.session.execute(dialect_insert(connection, RevokedToken.__table__).values(row)
+                           .on_conflict_do_nothing(index_elements=['jti']))
+    elif not db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == row['jti'])).first():
+        db.session.add(RevokedToken(**row))
+    # Keeps the table to live tokens; an indexed range delete
+    db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= _utc(time.time())))
+    db.session.commit()
+    revoked_tokens.add(payload['jti'], payload['exp'])
+
+
+def prune(session):
+    """Delete revoked_tokens rows for tokens that have expired anyway. Returns the number removed."""
+    result = session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= _utc(time.time())))
+    session.commit()
+    return result.rowcount
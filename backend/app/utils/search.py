@@ -0,0 +1,205 @@
+import re
+
+from sqlalchemy import Float, Integer, bindparam, column, event, inspect, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Orphan, Volunteer, Donation, Event
+from app.utils.pagination import Page, encode_cursor, decode_cursor
+
+# kind: (model, title column, body columns)
+SOURCES = {
+    'orphans': (Orphan, 'name', ('background', 'health_status')),
+    'volunteers': (Volunteer, 'name', ('email', 'address')),
+    'donations': (Donation, 'donor_name', ('notes',)),
+    'events': (Event, 'name', ('description', 'location')),
+}
+KINDS = list(SOURCES)
+
+# A document's id is its row id * _SLOTS + the kind's position in KINDS, so
+# writes can replace or delete documents without looking anything up.
+_SLOTS = 8
+
+# search_index is an FTS5 table on SQLite and a tsvector table with a GIN index
+# on Postgres. It lives outside the ORM metadata (see migrations/env.py).
+_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2')",
+        # Title matches weigh ten times as much as body matches
+        "INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS search_index ("
+        "doc_id BIGINT PRIMARY KEY, title TEXT NOT NULL, body TEXT NOT NULL, "
+        "document TSVECTOR GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED)",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING gin (document)",
+    ],
+}
+_ID = {'sqlite': 'rowid', 'postgresql': 'doc_id'}
+
+_SEARCH = {
+    'sqlite': """
+        SELECT rowid AS doc_id, title, snippet(search_index, -1, '', '', '…', 12) AS snippet, rank
+        FROM search_index
+        WHERE search_index MATCH :match {filters}
+        ORDER BY rank, rowid
+        LIMIT :limit
+    """,
+    'postgresql': """
+        SELECT doc_id, title, ts_headline('simple', body, query,
+                   'StartSel="", StopSel="", MaxWords=12, MinWords=4') AS snippet,
+               -ts_rank(document, query) AS rank
+        FROM search_index, to_tsquery('simple', :match) AS query
+        WHERE document @@ query {filters}
+        ORDER BY rank, doc_id
+        LIMIT :limit
+    """,
+}
+_RANK = {'sqlite': 'rank', 'postgresql': '-ts_rank(document, query)'}
+
+# Only used to type the values in a cursor
+_CURSOR_COLUMNS = [column('rank', Float), column('doc_id', Integer)]
+
+
+def supported(bind):
+    return bind.dialect.name in _DDL
+
+
+def create_index(connection):
+    for statement in _DDL[connection.dialect.name]:
+        connection.execute(text(statement))
+
+
+def _document(kind, values):
+    _, title, body = SOURCES[kind]
+    return {
+        'doc_id': values['id'] * _SLOTS + KINDS.index(kind),
+        'title': values[title] or '',
+        'body': ' '.join(values[name] or '' for name in body).strip(),
+    }
+
+
+def remove_documents(connection, kind, ids):
+    if not ids or not supported(connection):
+        return
+    id_column = _ID[connection.dialect.name]
+    connection.execute(
+        text(f'DELETE FROM search_index WHERE {id_column} IN :doc_ids')
+        .bindparams(bindparam('doc_ids', expanding=True)),
+        {'doc_ids': [ref_id * _SLOTS + KINDS.index(kind) for ref_id in ids]}
+    )
+
+
+def index_documents(connection, kind, rows):
+    """Add or replace the documents for ``rows`` (dicts with ``id`` and the source columns)."""
+    if not rows or not supported(connection):
+        return
+    documents = [_document(kind, row) for row in rows]
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            'INSERT INTO search_index (doc_id, title, body) VALUES (:doc_id, :title, :body) '
+            'ON CONFLICT (doc_id) DO UPDATE SET title = excluded.title, body = excluded.body'
+        ), documents)
+        return
+    remove_documents(connection, kind, [row['id'] for row in rows])
+    connection.execute(text('INSERT INTO search_index (rowid, title, body) VALUES (:doc_id, :title, :body)'),
+                       documents)
+
+
+def rebuild_index(connection):
+    """Re-create every document from the source tables. Returns the number indexed."""
+    connection.execute(text('DELETE FROM search_index'))
+    id_column = _ID[connection.dialect.name]
+    for slot, (model, title, body) in enumerate(SOURCES.values()):
+        joined = " || ' ' || ".join(f"coalesce({name}, '')" for name in body)
+        connection.execute(text(
+            f'INSERT INTO search_index ({id_column}, title, body) '
+            f"SELECT id * {_SLOTS} + {slot}, coalesce({title}, ''), trim({joined}) FROM {model.__tablename__}"
+        ))
+    return connection.execute(text('SELECT count(*) FROM search_index')).scalar()
+
+
+def _match(connection, query):
+    # Every word must match, each as a prefix; user input never reaches the query syntax
+    terms = re.findall(r'\w+', query.lower())
+    if connection.dialect.name == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(connection, query, kinds, limit, after=None):
+    """Ranked hits for ``query`` in ``kinds``, one keyset page (``after`` is a cursor) at a time."""
+    dialect = connection.dialect.name
+    params = {'match': _match(connection, query), 'limit': limit + 1}
+    filters = ''
+    if set(kinds) != set(KINDS):
+        filters += f' AND {_ID[dialect]} % {_SLOTS} IN :slots'
+        params['slots'] = [KINDS.index(kind) for kind in kinds]
+    if after:
+        params['after_rank'], params['after_id'] = decode_cursor(after, _CURSOR_COLUMNS)
+        filters += f' AND ({_RANK[dialect]}, {_ID[dialect]}) > (:after_rank, :after_id)'
+
+    stmt = text(_SEARCH[dialect].format(filters=filters))
+    if 'slots' in params:
+        stmt = stmt.bindparams(bindparam('slots', expanding=True))
+    rows = connection.execute(stmt, params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['rank'], rows[-1]['doc_id']])
+
+    hits = [
+        {
+            'type': KINDS[row['doc_id'] % _SLOTS],
+            'id': row['doc_id'] // _SLOTS,
+            'title': row['title'],
+            'snippet': row['snippet'],
+            'rank': row['rank'],
+        }
+        for row in rows
+    ]
+    return Page(hits, next_cursor, limit)
+
+
+_MODELS = {model: kind for kind, (model, _, _) in SOURCES.items()}
+_INDEXED_COLUMNS = {kind: (title, *body) for kind, (_, title, body) in SOURCES.items()}
+
+
+def _values(kind, obj):
+    return {'id': obj.id, **{name: getattr(obj, name) for name in _INDEXED_COLUMNS[kind]}}
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_index(session, flush_context):
+    changed, removed = {}, {}
+    for obj in session.new:
+        kind = _MODELS.get(type(obj))
+        if kind:
+            changed.setdefault(kind, []).append(_values(kind, obj))
+    for obj in session.dirty:
+        kind = _MODELS.get(type(obj))
+        if kind and any(inspect(obj).attrs[name].history.has_changes() for name in _INDEXED_COLUMNS[kind]):
+            changed.setdefault(kind, []).append(_values(kind, obj))
+    for obj in session.deleted:
+        kind = _MODELS.get(type(obj))
+        if kind:
+            removed.setdefault(kind, []).append(obj.id)
+
+    if not (changed or removed):
+        return
+    # Same transaction as the rows themselves
+    connection = session.connection()
+    for kind, rows in changed.items():
+        index_documents(connection, kind, rows)
+    for kind, ids in removed.items():
+        remove_documents(connection, kind, ids)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_with_tables(target, connection, **kw):
+    # db.create_all() setups (scripts, benchmarks) get the index too
+    if supported(connection):
+        create_index(connection)
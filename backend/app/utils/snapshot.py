@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class TTLSnapshot:
+    """A single cached value, rebuilt at most once per ``ttl`` seconds per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get(self, build, ttl):
+        if time.monotonic() < self._expires_at:
+            return self._value
+
+        # Only one thread rebuilds; the others wait and reuse its result
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._value
+            generation = self._generation
+            value = build()
+            # Don't keep a value that was invalidated while it was being built
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + ttl
+            return value
+
+    def peek(self):
+        """The value while it is fresh, else None; never builds."""
+        return self._value if time.monotonic() < self._expires_at else None
+
+    def invalidate(self, *args):
+        self._generation += 1
+        self._expires_at = 0.0
@@ -0,0 +1,23 @@
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+_DIALECT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def dialect_insert(bind, table):
+    """INSERT for ``table`` that supports ON CONFLICT on SQLite and Postgres, else plain Core."""
+    return _DIALECT_INSERTS.get(bind.dialect.name, insert)(table)
+
+
+def supports_upsert(bind):
+    return bind.dialect.name in _DIALECT_INSERTS
+
+
+def month_key(bind, column):
+    # 'YYYY-MM' bucket of a datetime column, computed in the database
+    if bind.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
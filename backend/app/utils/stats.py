@@ -0,0 +1,186 @@
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import StatsCounter, Orphan, Volunteer, Donation, Event
+from app.utils.sql import dialect_insert, supports_upsert, month_key
+
+# Counter keys:
+#   orphans / volunteers / donations / events   table totals
+#   donations:YYYY-MM / events:YYYY-MM          per-month buckets
+#   donor:<id>                                  donations of one donor (amount = money given)
+
+
+def _keys(obj, **values):
+    """(key, amount) pairs ``obj`` contributes to, using ``values`` to override attributes."""
+    get = lambda name: values[name] if name in values else getattr(obj, name)
+
+    if isinstance(obj, Orphan):
+        return [('orphans', 0.0)]
+    if isinstance(obj, Volunteer):
+        return [('volunteers', 0.0)]
+    if isinstance(obj, Event):
+        date = get('date')
+        return [('events', 0.0)] + ([(f'events:{date:%Y-%m}', 0.0)] if date else [])
+    if isinstance(obj, Donation):
+        date, donor_id = get('date'), get('donor_id')
+        money = float(get('amount') or 0) if get('donation_type') == 'Money' else 0.0
+        keys = [('donations', money)]
+        if date:
+            keys.append((f'donations:{date:%Y-%m}', money))
+        if donor_id:
+            keys.append((f'donor:{donor_id}', money))
+        return keys
+    return []
+
+
+# Attributes whose change moves a row between counters
+_TRACKED = {
+    Event: ('date',),
+    Donation: ('date', 'donor_id', 'donation_type', 'amount'),
+}
+
+
+def _previous_values(obj):
+    state = inspect(obj)
+    changed = False
+    previous = {}
+    for name in _TRACKED.get(type(obj), ()):
+        history = state.attrs[name].history
+        if history.deleted:
+            previous[name] = history.deleted[0]
+            changed = True
+        elif history.unchanged:
+            previous[name] = history.unchanged[0]
+    return previous if changed else None
+
+
+def apply_deltas(connection, counts, amounts):
+    """Add ``counts``/``amounts`` (dicts keyed by counter key) to stats_counters."""
+    keys = [key for key in set(counts) | set(amounts) if counts.get(key) or amounts.get(key)]
+    if not keys:
+        return
+    table = StatsCounter.__table__
+    rows = [{'key': key, 'count': counts.get(key, 0), 'amount': amounts.get(key, 0.0)} for key in keys]
+
+    if supports_upsert(connection):
+        stmt = dialect_insert(connection, table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={'count': table.c.count + stmt.excluded.count,
+                  'amount': table.c.amount + stmt.excluded.amount}
+        ))
+        return
+
+    for row in rows:
+        result = connection.execute(
+            table.update().where(table.c.key == row['key']).values(
+                count=table.c.count + row['count'], amount=table.c.amount + row['amount'])
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+def record(session, objects, sign=1):
+    """Count ``objects`` that were written outside the unit of work (e.g. bulk inserts)."""
+    counts, amounts = Counter(), Counter()
+    for obj in objects:
+        for key, money in _keys(obj):
+            counts[key] += sign
+            amounts[key] += sign * money
+    apply_deltas(session.connection(), counts, amounts)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_counters(session, flush_context):
+    counts, amounts = Counter(), Counter()
+
+    def add(pairs, sign):
+        for key, money in pairs:
+            counts[key] += sign
+            amounts[key] += sign * money
+
+    for obj in session.new:
+        add(_keys(obj), 1)
+    for obj in session.deleted:
+        # Deleted objects may already carry edits made before the delete
+        add(_keys(obj, **(_previous_values(obj) or {})), -1)
+    for obj in session.dirty:
+        previous = _previous_values(obj)
+        if previous is not None:
+            add(_keys(obj, **previous), -1)
+            add(_keys(obj), 1)
+
+    # Same connection, same transaction as the rows being counted
+    apply_deltas(session.connection(), counts, amounts)
+
+
+def get_counters(*keys, prefix=None):
+    query = db.session.query(StatsCounter)
+    if prefix:
+        query = query.filter(db.or_(StatsCounter.key.in_(keys), StatsCounter.key.like(f'{prefix}%')))
+    else:
+        query = query.filter(StatsCounter.key.in_(keys))
+    return {row.key: row for row in query}
+
+
+def compute_counters(connection):
+    """Recount everything from the source tables: {key: (count, amount)}."""
+    expected = {}
+
+    def add(key, count, amount=0.0):
+        expected[key] = (int(count), float(amount or 0))
+
+    money = func.sum(db.case((Donation.donation_type == 'Money', func.coalesce(Donation.amount, 0)), else_=0))
+
+    for model, key in ((Orphan, 'orphans'), (Volunteer, 'volunteers'), (Event, 'events')):
+        add(key, connection.execute(select(func.count()).select_from(model)).scalar())
+
+    count, amount = connection.execute(select(func.count(), money)).one()
+    add('donations', count, amount)
+
+    event_month = month_key(connection, Event.date)
+    for month, count in connection.execute(
+            select(event_month, func.count()).where(Event.date.isnot(None)).group_by(event_month)):
+        add(f'events:{month}', count)
+
+    donation_month = month_key(connection, Donation.date)
+    for month, count, amount in connection.execute(
+            select(donation_month, func.count(), money).where(Donation.date.isnot(None)).group_by(donation_month)):
+        add(f'donations:{month}', count, amount)
+
+    for donor_id, count, amount in connection.execute(
+            select(Donation.donor_id, func.count(), money).where(Donation.donor_id.isnot(None))
+            .group_by(Donation.donor_id)):
+        add(f'donor:{donor_id}', count, amount)
+
+    return {key: value for key, value in expected.items() if value[0] or value[1]}
+
+
+def rebuild_counters(session, dry_run=False):
+    """Rebuild stats_counters from scratch and return the drift that was found.
+
+    Drift is a list of (key, stored, expected) where each side is (count, amount).
+    """
+    connection = session.connection()
+    table = StatsCounter.__table__
+
+    expected = compute_counters(connection)
+    stored = {row.key: (row.count, row.amount) for row in connection.execute(select(table))}
+
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        have, want = stored.get(key, (0, 0.0)), expected.get(key, (0, 0.0))
+        if have[0] != want[0] or abs(have[1] - want[1]) > 1e-6:
+            drift.append((key, have, want))
+
+    if not dry_run:
+        connection.execute(table.delete())
+        if expected:
+            connection.execute(table.insert(), [
+                {'key': key, 'count': count, 'amount': amount} for key, (count, amount) in expected.items()
+            ])
+        session.commit()
+    return drift
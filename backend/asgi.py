@@ -0,0 +1,15 @@
+"""ASGI entry point: the same app, with async views for the busiest GETs.
+
+    uvicorn asgi:app --workers 4
+
+GET /api/events/, /api/inventory/ and /api/dashboard/ run on the event loop
+with async SQLAlchemy sessions (aiosqlite or asyncpg), so hundreds of them can
+wait on the database per worker. Every other route runs unchanged on a pool of
+ASGI_SYNC_THREADS threads (ASGI_ASYNC_VIEWS=0 puts all routes there).
+The database pool (DB_POOL_SIZE + DB_MAX_OVERFLOW) then bounds how many
+of those reads query at once, rather than the thread count.
+`python run.py` / `flask run` keep serving the plain WSGI app.
+"""
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
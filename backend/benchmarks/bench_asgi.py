@@ -0,0 +1,186 @@
+"""Load-test one ASGI worker with the async views on and off.
+
+Starts `uvicorn asgi:app` (one worker) against a fresh SQLite database, once
+with ASGI_ASYNC_VIEWS=0 (every route on the ASGI_SYNC_THREADS threads, like a
+threaded WSGI server) and once with the async views. At each concurrency it
+keeps that many clients busy with event/inventory/dashboard reads and some
+inventory deductions. It reports throughput, latency and failed requests.
+
+Local SQLite answers in microseconds, which flatters threads. --db-latency
+adds a wait to every SQL statement in the thread that runs it (the request
+thread, or aiosqlite's own), the way a network round trip to PostgreSQL would.
+
+    python benchmarks/bench_asgi.py --concurrency 16,64,256 --seconds 10 --db-latency 5
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, BACKEND)
+
+
+def _environ(url, threads):
+    env = dict(os.environ, DATABASE_URL=url, ASGI_SYNC_THREADS=str(threads),
+               # Measure the database, not the GET response cache
+               RESPONSE_CACHE='none', PASSWORD_HASH_WORKERS='0')
+    return env
+
+
+def _setup(url, items, events, tokens):
+    os.environ.update(_environ(url, 1))
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for i in range(items):
+        client.post('/api/inventory/add', json={'item_name': f'Item {i}', 'category': 'Food', 'quantity': 10 ** 6})
+    for i in range(events):
+        client.post('/api/events/', json={'name': f'Event {i}', 'date': f'2026-{i % 12 + 1:02d}-01T10:00:00'})
+    r = client.post('/api/auth/register', json={'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'})
+    tokens.put(r.get_json()['token'])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _add_latency(app, seconds):
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+    from app import db
+
+    def wait(statement):
+        time.sleep(seconds)
+
+    with app.app_context():
+        engines = [db.engine, app.extensions['async_engines']['primary'].sync_engine]
+    for engine in engines:
+        @event.listens_for(engine, 'connect')
+        def _trace(dbapi_connection, connection_record):
+            driver = connection_record.driver_connection
+            result = driver.set_trace_callback(wait)
+            if asyncio.iscoroutine(result):  # aiosqlite runs it on its connection thread
+                await_only(result)
+        engine.dispose()
+
+
+def _run_server(port, latency):
+    # The server process: uvicorn with the app from asgi.py, one worker
+    import uvicorn
+    from asgi import app
+
+    if latency:
+        _add_latency(app.app, latency / 1000)
+    uvicorn.run(app, port=port, log_level='warning', timeout_keep_alive=60)
+
+
+def _serve(url, async_views, args):
+    port = _free_port()
+    env = dict(_environ(url, args.threads), ASGI_ASYNC_VIEWS='1' if async_views else '0')
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', str(port), '--db-latency', str(args.db_latency)],
+        cwd=BACKEND, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            httpx.get(f'{base_url}/api/dashboard/test')
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('uvicorn did not start')
+
+
+async def _load(base_url, token, concurrency, seconds, items, writes):
+    headers = {'Authorization': f'Bearer {token}'}
+    counts = Counter()
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + seconds
+
+        async def run(seed):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                roll = rng.random()
+                started = time.perf_counter()
+                try:
+                    if roll < writes:
+                        r = await client.post('/api/inventory/deduct',
+                                              json={'item': f'Item {rng.randrange(items)}', 'quantity': 1})
+                    elif roll < writes + (1 - writes) / 3:
+                        r = await client.get('/api/events/?limit=50')
+                    elif roll < writes + 2 * (1 - writes) / 3:
+                        r = await client.get('/api/inventory/?limit=50')
+                    else:
+                        r = await client.get('/api/dashboard/', headers=headers)
+                    counts['failed' if r.status_code >= 500 else 'ok'] += 1
+                except httpx.HTTPError:
+                    counts['failed'] += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(run(i) for i in range(concurrency)))
+    return counts, sorted(latencies)
+
+
+def bench(mode, url, token, args):
+    server, base_url = _serve(url, mode == 'async', args)
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            counts, latencies = asyncio.run(
+                _load(base_url, token, concurrency, args.seconds, args.items, args.writes))
+            pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+            requests = counts['ok'] + counts['failed']
+            print(f"{mode:>8} x{concurrency:<4}: {requests / args.seconds:7.0f} req/s, "
+                  f"p50 {pick(0.5):6.1f} ms, p99 {pick(0.99):7.1f} ms, {counts['failed']} failed")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='16,64,256', help='Concurrent clients, comma separated')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=16, help='ASGI_SYNC_THREADS of the worker')
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--writes', type=float, default=0.1, help='Share of requests that deduct stock')
+    parser.add_argument('--modes', default='threads,async')
+    parser.add_argument('--db-latency', type=float, default=0, help='Milliseconds added to each SQL statement')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return _run_server(args.serve, args.db_latency)
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'asgi.db')}"
+    context = multiprocessing.get_context('spawn')
+    tokens = context.Queue()
+    setup = context.Process(target=_setup, args=(url, args.items, args.events, tokens))
+    setup.start()
+    token = tokens.get()
+    setup.join()
+
+    for mode in args.modes.split(','):
+        bench(mode, url, token, args)
+
+
+if __name__ == '__main__':
+    main()
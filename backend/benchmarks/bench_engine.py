@@ -0,0 +1,126 @@
+"""Compare engine profiles under concurrent reads and writes on one SQLite file.
+
+Several worker processes (like gunicorn workers), each with a few threads,
+mix inventory deductions and stock updates with inventory/log reads for a
+fixed time. Runs once per profile against a fresh database and reports
+throughput and failed requests ("database is locked" shows up as 500s).
+
+    python benchmarks/bench_engine.py --processes 4 --threads 8 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _environ(url, profile):
+    os.environ['DATABASE_URL'] = url
+    os.environ['DB_ENGINE_PROFILE'] = profile
+    # Measure the database, not the GET response cache
+    os.environ['RESPONSE_CACHE'] = 'none'
+
+
+def _setup(url, profile, items):
+    _environ(url, profile)
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for i in range(items):
+        client.post('/api/inventory/add', json={'item_name': f'Item {i}', 'category': 'Food', 'quantity': 10 ** 6})
+
+
+def _worker(url, profile, threads, seconds, items, results):
+    import threading
+
+    _environ(url, profile)
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    deadline = time.monotonic() + seconds
+    lock = threading.Lock()
+    counts = Counter()
+
+    def run(seed):
+        rng = random.Random(seed)
+        local = Counter()
+        while time.monotonic() < deadline:
+            roll = rng.random()
+            name = f'Item {rng.randrange(items)}'
+            try:
+                if roll < 0.3:
+                    r = client.post('/api/inventory/deduct', json={'item': name, 'quantity': 1})
+                    kind = 'write'
+                elif roll < 0.4:
+                    r = client.put('/api/inventory/update',
+                                   json={'item_name': name, 'category': 'Food', 'quantity_change': 1})
+                    kind = 'write'
+                elif roll < 0.7:
+                    r = client.get('/api/inventory/?limit=50')
+                    kind = 'read'
+                else:
+                    r = client.get('/api/inventory/logs?limit=50')
+                    kind = 'read'
+                local[kind] += 1
+                local['failed' if r.status_code >= 500 else 'ok'] += 1
+            except Exception:
+                local['failed'] += 1
+        with lock:
+            counts.update(local)
+
+    workers = [threading.Thread(target=run, args=(os.getpid() * 100 + i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results.put(dict(counts))
+
+
+def bench(profile, args):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'engine.db')}"
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=_setup, args=(url, profile, args.items))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(url, profile, args.threads, args.seconds, args.items, results))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    totals = Counter()
+    for _ in processes:
+        totals.update(results.get())
+    for process in processes:
+        process.join()
+
+    requests = totals['ok'] + totals['failed']
+    print(f"{profile:>12}: {requests / args.seconds:7.0f} req/s "
+          f"({totals['read'] / args.seconds:.0f} reads/s, {totals['write'] / args.seconds:.0f} writes/s), "
+          f"{totals['failed']} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--profiles', default='none,sqlite-wal')
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(','):
+        bench(profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Query plans and latency of the hot route queries with and without secondary indexes.
+
+Seeds a throwaway SQLite database (about 1M rows by default), runs every
+query with the indexes dropped, then again after creating them.
+
+    python benchmarks/bench_indexes.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def seed(db, rows):
+    from app.models import Donor, Donation, Event, Inventory, InventoryLog
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    span = int((datetime.utcnow() - start).total_seconds())
+    categories = ['Food', 'Medical', 'Clothes', 'Stationery', 'Things']
+
+    # Split roughly like production: logs and donations dominate
+    n_logs, n_donations = int(rows * 0.5), int(rows * 0.4)
+    n_events, n_inventory, n_donors = int(rows * 0.05), int(rows * 0.04), max(1, int(rows * 0.01))
+
+    def when():
+        return start + timedelta(seconds=rng.randrange(span))
+
+    def insert(model, generate, count, chunk=20000):
+        table = model.__table__
+        for offset in range(0, count, chunk):
+            batch = [generate(i) for i in range(offset, min(offset + chunk, count))]
+            db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+    insert(Donor, lambda i: dict(name=f'donor{i}', email=f'donor{i}@example.org', password_hash='x',
+                                 created_at=when(), is_active=True), n_donors)
+    insert(Inventory, lambda i: dict(item_name=f'item{i}', category=rng.choice(categories),
+                                     quantity=rng.randrange(200)), n_inventory)
+    insert(Donation, lambda i: dict(donor_id=rng.randrange(1, n_donors + 1), donor_name=f'donor{i}',
+                                    donation_type='Money', amount=rng.random() * 500, date=when(),
+                                    status='completed'), n_donations)
+    insert(Event, lambda i: dict(name=f'event{i}', date=when(), created_at=when()), n_events)
+    insert(InventoryLog, lambda i: dict(item_name=f'item{rng.randrange(n_inventory)}',
+                                        category=rng.choice(categories), action='ADD', quantity=1,
+                                        quantity_changed=1, timestamp=when()), n_logs)
+    return n_donors, n_inventory
+
+
+def route_queries(n_donors, n_inventory):
+    from sqlalchemy import func, select, tuple_
+    from app.models import Donation, Event, Inventory, InventoryLog
+
+    now = datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    donor_id = n_donors // 2
+    item = f'item{n_inventory // 2}'
+    cursor = (now - timedelta(days=365), 10 ** 9)
+
+    return {
+        'donor donations page': select(Donation).where(Donation.donor_id == donor_id)
+            .order_by(Donation.date.desc(), Donation.id.desc()).limit(51),
+        'donations keyset page': select(Donation).where(tuple_(Donation.date, Donation.id) < cursor)
+            .order_by(Donation.date.desc(), Donation.id.desc()).limit(51),
+        'donations this month': select(func.count()).select_from(Donation)
+            .where(Donation.date >= month_start),
+        'inventory by name+category': select(Inventory.quantity)
+            .where(Inventory.item_name == item, Inventory.category == 'Food'),
+        'low inventory': select(Inventory).where(Inventory.quantity < 10),
+        'logs keyset page': select(InventoryLog)
+            .where(tuple_(InventoryLog.timestamp, InventoryLog.id) < cursor)
+            .order_by(InventoryLog.timestamp.desc(), InventoryLog.id.desc()).limit(51),
+        'upcoming events': select(func.count()).select_from(Event).where(Event.date >= now),
+        'events page': select(Event).order_by(Event.date.desc(), Event.id.desc()).limit(51),
+    }
+
+
+def measure(db, queries, repeat):
+    results = {}
+    for name, stmt in queries.items():
+        compiled = stmt.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.session.execute(stmt).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (statistics.median(timings), ' | '.join(row[-1] for row in plan))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+        for index in indexes:
+            index.drop(db.engine)
+
+        print(f'Seeding {args.rows} rows into {path} ...')
+        counts = seed(db, args.rows)
+        queries = route_queries(*counts)
+
+        before = measure(db, queries, args.repeat)
+        for index in indexes:
+            index.create(db.engine)
+        db.session.execute(db.text('ANALYZE'))
+        after = measure(db, queries, args.repeat)
+
+    print(f'\n{"query":<28} {"before ms":>10} {"after ms":>10}')
+    for name in queries:
+        print(f'{name:<28} {before[name][0]:>10.2f} {after[name][0]:>10.2f}')
+        print(f'    before: {before[name][1]}')
+        print(f'    after:  {after[name][1]}')
+
+
+if __name__ == '__main__':
+    main()
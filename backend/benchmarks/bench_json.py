@@ -0,0 +1,101 @@
+"""Serialization throughput for an inventory log dump: old to_dict + stdlib json vs. schema rows + app provider.
+
+    python benchmarks/bench_json.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def legacy_to_dict(log):
+    # What InventoryLog.to_dict() did before schemas: one isoformat() call per row
+    return {
+        "id": log.id,
+        "item_name": log.item_name,
+        "category": log.category if hasattr(log, 'category') else None,
+        "action": log.action,
+        "quantity": log.quantity,
+        "quantity_changed": log.quantity_changed if hasattr(log, 'quantity_changed') else None,
+        "timestamp": log.timestamp.isoformat(),
+        "remarks": log.remarks
+    }
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'json.db')}"
+
+    from sqlalchemy import select
+
+    from app import create_app, db
+    from app.models import InventoryLog
+    from app.utils.serialization import orjson, row_to_dict
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = datetime(2024, 1, 1)
+        db.session.execute(InventoryLog.__table__.insert(), [
+            dict(item_name=f'item{i % 500}', category='Food', action='ADD', quantity=i % 50,
+                 quantity_changed=i % 50, timestamp=start + timedelta(minutes=i), remarks='Donated')
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+
+        def legacy():
+            logs = InventoryLog.query.order_by(InventoryLog.timestamp.desc()).all()
+            json.dumps([legacy_to_dict(log) for log in logs], sort_keys=True)
+            db.session.expunge_all()
+
+        def orm_provider():
+            logs = InventoryLog.query.order_by(InventoryLog.timestamp.desc()).all()
+            app.json.dumps([log.to_dict() for log in logs])
+            db.session.expunge_all()
+
+        def rows_provider():
+            rows = db.session.execute(
+                select(*InventoryLog.columns()).order_by(InventoryLog.timestamp.desc())
+            ).mappings().all()
+            app.json.dumps([row_to_dict(row) for row in rows])
+
+        def serialize_only(dicts):
+            return lambda: app.json.dumps(dicts)
+
+        cached = [legacy_to_dict(log) for log in InventoryLog.query.all()]
+        raw = [row_to_dict(row) for row in db.session.execute(select(*InventoryLog.columns())).mappings()]
+        db.session.expunge_all()
+
+        results = [
+            ('stdlib dumps only (pre-built dicts)', best_of(args.repeat, lambda: json.dumps(cached, sort_keys=True))),
+            ('provider dumps only (raw rows)', best_of(args.repeat, serialize_only(raw))),
+            ('ORM + legacy to_dict + stdlib', best_of(args.repeat, legacy)),
+            ('ORM + schema to_dict + provider', best_of(args.repeat, orm_provider)),
+            ('result rows + provider', best_of(args.repeat, rows_provider)),
+        ]
+
+    print(f"{args.rows} rows, JSON backend: {'orjson' if orjson else 'stdlib'}")
+    for name, seconds in results:
+        print(f'{name:<38} {seconds * 1000:8.1f} ms  {args.rows / seconds:>10,.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Flood the login endpoint and measure what it does to the rest of the API.
+
+Runs the same login spike with hashing in the request thread
+(PASSWORD_HASH_WORKERS=0) and in the bounded pool, while one thread keeps
+polling GET /api/orphans/. Reports login outcomes and latency separately from
+the orphan list latency.
+
+    python benchmarks/bench_login.py --threads 64 --logins 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000 if samples else 0.0
+
+
+def run(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'login.db')}"
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/api/auth/register', json={'name': 'Staff', 'email': 'staff@example.org', 'password': 'secret'})
+    for i in range(50):
+        client.post('/api/orphans/', json={'name': f'Child {i}', 'age': 8, 'gender': 'F'})
+
+    statuses, login_times, probe_times = Counter(), [], []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def login():
+        for _ in range(args.logins):
+            started = time.perf_counter()
+            r = client.post('/api/auth/login', json={'email': 'staff@example.org', 'password': 'secret'})
+            with lock:
+                statuses[r.status_code] += 1
+                if r.status_code == 200:
+                    login_times.append(time.perf_counter() - started)
+            if r.status_code == 503:
+                time.sleep(min(float(r.headers['Retry-After']), 0.5))
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/orphans/?limit=20')
+            probe_times.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=login) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+
+    print(f"  logins: {dict(sorted(statuses.items()))} in {elapsed:.1f}s, "
+          f"p50 {percentile(login_times, 0.5):.0f} ms, p95 {percentile(login_times, 0.95):.0f} ms")
+    print(f"  GET /api/orphans/ during the spike: {len(probe_times)} requests, "
+          f"p50 {percentile(probe_times, 0.5):.1f} ms, p95 {percentile(probe_times, 0.95):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=64, help='Concurrent login clients')
+    parser.add_argument('--logins', type=int, default=5, help='Logins per client')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS for the pooled run')
+    parser.add_argument('--mode', choices=['inline', 'pool'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+
+    # Each mode in a fresh interpreter, so the config is read from the environment
+    for mode, workers in (('inline', 0), ('pool', args.workers)):
+        print(f'{mode} (PASSWORD_HASH_WORKERS={workers}):', flush=True)
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--threads', str(args.threads),
+                        '--logins', str(args.logins)],
+                       env={**os.environ, 'PASSWORD_HASH_WORKERS': str(workers)}, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Hammer /api/inventory/deduct and /update from many threads and check stock never goes negative.
+
+Every successful deduction must be matched by exactly one log row and the
+final quantity must equal the starting stock minus what was handed out.
+
+    python benchmarks/stress_inventory.py --threads 32 --requests 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+    parser.add_argument('--stock', type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+
+    from app import create_app, db
+    from app.models import Inventory, InventoryLog
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/api/inventory/add', json={'item_name': 'Rice', 'category': 'Food', 'quantity': args.stock})
+
+    statuses = Counter()
+    taken = Counter()
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local, local_taken = Counter(), 0
+        for _ in range(args.requests):
+            qty = rng.randint(1, 5)
+            if rng.random() < 0.8:
+                r = client.post('/api/inventory/deduct', json={'item': 'Rice', 'quantity': qty})
+                if r.status_code == 200:
+                    local_taken += qty
+            else:
+                r = client.put('/api/inventory/update',
+                               json={'item_name': 'Rice', 'category': 'Food', 'quantity_change': -qty})
+                if r.status_code == 200:
+                    local_taken += qty
+            local[r.status_code] += 1
+        with lock:
+            statuses.update(local)
+            taken['total'] += local_taken
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        item = Inventory.query.filter_by(item_name='Rice').one()
+        logged = -db.session.query(db.func.sum(InventoryLog.quantity_changed))\
+            .filter(InventoryLog.quantity_changed < 0).scalar() or 0
+
+    total = args.threads * args.requests
+    print(f'{total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s), statuses {dict(statuses)}')
+    print(f'start {args.stock}, handed out {taken["total"]}, logged {logged}, left {item.quantity}')
+
+    ok = item.quantity >= 0 and item.quantity == args.stock - taken['total'] == args.stock - logged
+    print('OK' if ok else 'FAILED: stock and logs disagree')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Add replica_pins
+
+Revision ID: 022096c793a6
+Revises: 0bb53fb57f3d
+Create Date: 2026-10-18 16:47:44.991585
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '022096c793a6'
+down_revision = '0bb53fb57f3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('replica_pins',
+    sa.Column('principal', sa.String(length=120), nullable=False),
+    sa.Column('until', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('principal')
+    )
+    with op.batch_alter_table('replica_pins', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_replica_pins_until'), ['until'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('replica_pins', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_replica_pins_until'))
+
+    op.drop_table('replica_pins')
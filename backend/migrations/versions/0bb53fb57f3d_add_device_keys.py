@@ -0,0 +1,39 @@
+"""Add device_keys
+
+Revision ID: 0bb53fb57f3d
+Revises: cfda7fec9fa9
+Create Date: 2026-10-18 16:33:46.592014
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0bb53fb57f3d'
+down_revision = 'cfda7fec9fa9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('device_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_type', sa.String(length=10), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('key_hash', sa.String(length=64), nullable=False),
+    sa.Column('hash_version', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key_hash')
+    )
+    with op.batch_alter_table('device_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_device_keys_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('device_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_device_keys_expires_at'))
+
+    op.drop_table('device_keys')
@@ -0,0 +1,49 @@
+"""Add indexes for hot query paths
+
+Revision ID: 3b9c1d2e4f70
+Revises: f176e6e55189
+Create Date: 2026-10-18 10:02:14.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9c1d2e4f70'
+down_revision = 'f176e6e55189'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.create_index('ix_donations_donor_id_date', ['donor_id', 'date'], unique=False)
+        batch_op.create_index('ix_donations_date_id', ['date', 'id'], unique=False)
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.create_index('ix_events_date_id', ['date', 'id'], unique=False)
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.create_index('ix_inventory_item_name_category', ['item_name', 'category'], unique=False,
+                              postgresql_include=['quantity'])
+        batch_op.create_index('ix_inventory_quantity', ['quantity'], unique=False)
+
+    with op.batch_alter_table('inventory_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_inventory_logs_timestamp_id', ['timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_logs_timestamp_id')
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_quantity')
+        batch_op.drop_index('ix_inventory_item_name_category')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_date_id')
+
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('ix_donations_date_id')
+        batch_op.drop_index('ix_donations_donor_id_date')
@@ -0,0 +1,40 @@
+"""Add list filter indexes
+
+Revision ID: 5b3ee8c38cec
+Revises: f2a8d41c7e05
+Create Date: 2026-10-18 15:46:38.335704
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b3ee8c38cec'
+down_revision = 'f2a8d41c7e05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.create_index('ix_donations_type_date', ['donation_type', 'date'], unique=False)
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.create_index('ix_inventory_category_id', ['category', 'id'], unique=False)
+
+    with op.batch_alter_table('orphans', schema=None) as batch_op:
+        batch_op.create_index('ix_orphans_admission_date_id', ['admission_date', 'id'], unique=False)
+        batch_op.create_index('ix_orphans_age', ['age'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orphans', schema=None) as batch_op:
+        batch_op.drop_index('ix_orphans_age')
+        batch_op.drop_index('ix_orphans_admission_date_id')
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_category_id')
+
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('ix_donations_type_date')
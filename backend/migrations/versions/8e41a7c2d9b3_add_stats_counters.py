@@ -0,0 +1,46 @@
+"""Add stats_counters
+
+Revision ID: 8e41a7c2d9b3
+Revises: 3b9c1d2e4f70
+Create Date: 2026-10-18 11:40:52.107334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41a7c2d9b3'
+down_revision = '3b9c1d2e4f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stats_counters',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+    # Backfill from existing rows so the dashboard is right straight away
+    month = "to_char({0}, 'YYYY-MM')" if op.get_bind().dialect.name == 'postgresql' else "strftime('%Y-%m', {0})"
+    money = "COALESCE(SUM(CASE WHEN donation_type = 'Money' THEN amount END), 0)"
+    op.execute(f"""
+        INSERT INTO stats_counters (key, count, amount)
+        SELECT 'orphans', COUNT(*), 0 FROM orphans
+        UNION ALL SELECT 'volunteers', COUNT(*), 0 FROM volunteers
+        UNION ALL SELECT 'events', COUNT(*), 0 FROM events
+        UNION ALL SELECT 'donations', COUNT(*), {money} FROM donations
+        UNION ALL SELECT 'events:' || {month.format('date')}, COUNT(*), 0
+            FROM events WHERE date IS NOT NULL GROUP BY {month.format('date')}
+        UNION ALL SELECT 'donations:' || {month.format('date')}, COUNT(*), {money}
+            FROM donations WHERE date IS NOT NULL GROUP BY {month.format('date')}
+        UNION ALL SELECT 'donor:' || CAST(donor_id AS VARCHAR), COUNT(*), {money}
+            FROM donations WHERE donor_id IS NOT NULL GROUP BY donor_id
+    """)
+
+
+def downgrade():
+    op.drop_table('stats_counters')
@@ -0,0 +1,67 @@
+"""Add donation_rollups
+
+Revision ID: 9ff7fd168525
+Revises: 5b3ee8c38cec
+Create Date: 2026-10-18 15:49:14.116188
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9ff7fd168525'
+down_revision = '5b3ee8c38cec'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('donation_rollups',
+    sa.Column('grain', sa.String(length=8), nullable=False),
+    sa.Column('key', sa.String(length=120), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('grain', 'key', 'period')
+    )
+
+    # Backfill from existing donations; same rules as rebuild_rollups() in app/utils/analytics.py
+    if op.get_bind().dialect.name == 'postgresql':
+        day = "to_char(d.date, 'YYYY-MM-DD')"
+        items = ("json_array_elements(CASE WHEN json_typeof(d.donated_items) = 'array' "
+                 "THEN d.donated_items ELSE '[]'::json END) AS i")
+        field = "(i.value ->> '{}')"
+        # JSON numbers written as whole numbers only, so the CAST below cannot fail
+        whole = "json_typeof(i.value -> 'quantity') = 'number' AND (i.value ->> 'quantity') ~ '^[0-9]+$'"
+    else:
+        day = "strftime('%Y-%m-%d', d.date)"
+        items = "json_each(CASE WHEN json_type(d.donated_items) = 'array' THEN d.donated_items ELSE '[]' END) AS i"
+        # Entries that are not objects read as NULL rather than malformed JSON
+        field = "json_extract(CASE WHEN i.type = 'object' THEN i.value END, '$.{}')"
+        whole = "json_type(CASE WHEN i.type = 'object' THEN i.value END, '$.quantity') = 'integer'"
+    item, category = field.format('item'), field.format('category')
+    # Whole-number quantities only, as receive_items() accepts
+    quantity = f"CASE WHEN {whole} THEN CAST({field.format('quantity')} AS INTEGER) END"
+    money = "coalesce(sum(CASE WHEN d.donation_type = 'Money' THEN d.amount END), 0)"
+    donor = ("CASE WHEN d.donor_id IS NOT NULL THEN 'donor:' || CAST(d.donor_id AS VARCHAR) "
+             "ELSE 'name:' || d.donor_name END")
+    category_key = (f"'category:' || coalesce(nullif({category}, ''), CASE WHEN lower({item}) "
+                    f"IN ('rice', 'dal', 'milk', 'veggies') THEN 'Grocery' ELSE 'Things' END)")
+
+    insert = 'INSERT INTO donation_rollups (grain, period, key, count, amount, quantity) '
+    op.execute(insert + f"SELECT 'day', {day}, 'total', count(*), {money}, 0 "
+                        f"FROM donations d WHERE d.date IS NOT NULL GROUP BY {day}")
+    op.execute(insert + f"SELECT 'day', {day}, {donor}, count(*), {money}, 0 FROM donations d "
+                        f"WHERE d.date IS NOT NULL GROUP BY {day}, {donor}")
+    op.execute(insert + f"SELECT 'day', {day}, {category_key}, count(*), 0, sum({quantity}) "
+                        f"FROM donations d, {items} "
+                        f"WHERE d.date IS NOT NULL AND coalesce({item}, '') != '' "
+                        f"AND {quantity} > 0 GROUP BY {day}, {category_key}")
+    op.execute(insert + "SELECT 'month', substr(period, 1, 7), key, sum(count), sum(amount), sum(quantity) "
+                        "FROM donation_rollups WHERE grain = 'day' GROUP BY substr(period, 1, 7), key")
+
+
+def downgrade():
+    op.drop_table('donation_rollups')
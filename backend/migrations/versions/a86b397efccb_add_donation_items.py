@@ -0,0 +1,109 @@
+"""Add donation_items
+
+Revision ID: a86b397efccb
+Revises: 9ff7fd168525
+Create Date: 2026-10-18 15:51:37.514108
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a86b397efccb'
+down_revision = '9ff7fd168525'
+branch_labels = None
+depends_on = None
+
+# Donations converted per statement during the backfill
+CHUNK = 1000
+
+
+def _create_table():
+    op.create_table('donation_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('donation_id', sa.Integer(), nullable=False),
+    sa.Column('inventory_id', sa.Integer(), nullable=True),
+    sa.Column('item_name', sa.String(length=100), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['donation_id'], ['donations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['inventory_id'], ['inventory.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('donation_items', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_items_date', ['date'], unique=False)
+        batch_op.create_index('ix_donation_items_donation_id', ['donation_id'], unique=False)
+        batch_op.create_index('ix_donation_items_inventory_id', ['inventory_id'], unique=False)
+        batch_op.create_index('ix_donation_items_item_name_date', ['item_name', 'date'], unique=False)
+
+
+def upgrade():
+    # A rerun after an interrupted backfill finds the table already committed
+    if not sa.inspect(op.get_bind()).has_table('donation_items'):
+        _create_table()
+
+    # Backfill from donated_items; same rules as receive_items() in app/utils/inventory.py
+    if op.get_bind().dialect.name == 'postgresql':
+        items = ("json_array_elements(CASE WHEN json_typeof(d.donated_items) = 'array' "
+                 "THEN d.donated_items ELSE '[]'::json END) AS i")
+        field = "(i.value ->> '{}')"
+        # JSON numbers written as whole numbers only, so the CAST below cannot fail
+        whole = "json_typeof(i.value -> 'quantity') = 'number' AND (i.value ->> 'quantity') ~ '^[0-9]+$'"
+    else:
+        items = "json_each(CASE WHEN json_type(d.donated_items) = 'array' THEN d.donated_items ELSE '[]' END) AS i"
+        # Entries that are not objects read as NULL rather than malformed JSON
+        field = "json_extract(CASE WHEN i.type = 'object' THEN i.value END, '$.{}')"
+        whole = "json_type(CASE WHEN i.type = 'object' THEN i.value END, '$.quantity') = 'integer'"
+    item, category = field.format('item'), field.format('category')
+    # Whole-number quantities only, as receive_items() accepts
+    quantity = f"CASE WHEN {whole} THEN CAST({field.format('quantity')} AS INTEGER) END"
+    # An item already in stock keeps its category, as when it was received
+    resolved = (f"coalesce((SELECT category FROM inventory WHERE item_name = {item} ORDER BY id LIMIT 1), "
+                f"nullif({category}, ''), CASE WHEN lower({item}) IN ('rice', 'dal', 'milk', 'veggies') "
+                f"THEN 'Grocery' ELSE 'Things' END)")
+    backfill = sa.text(
+        "INSERT INTO donation_items (donation_id, inventory_id, item_name, category, quantity, date) "
+        "SELECT l.donation_id, inv.id, l.item_name, l.category, l.quantity, l.date FROM ("
+        f"  SELECT d.id AS donation_id, {item} AS item_name, {resolved} AS category, "
+        f"         {quantity} AS quantity, d.date AS date "
+        f"  FROM donations d, {items} "
+        f"  WHERE d.id >= :low AND d.id < :high AND d.date IS NOT NULL "
+        f"    AND NOT EXISTS (SELECT 1 FROM donation_items x WHERE x.donation_id = d.id) "
+        f"    AND coalesce({item}, '') != '' AND {quantity} > 0"
+        ") AS l LEFT JOIN inventory inv ON inv.item_name = l.item_name AND inv.category = l.category"
+    )
+
+    # Online: the table and indexes are committed first, then each chunk is its
+    # own short transaction, so writers are never locked out for the whole run.
+    # Each donation's lines go in with one statement, so a donation that
+    # already has lines is complete and skipped: a rerun after a failure
+    # resumes, and donations the app wrote meanwhile are not doubled.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, top = bind.execute(sa.text('SELECT min(id), max(id) FROM donations')).one()
+        while low is not None and low <= top:
+            bind.execute(backfill, {'low': low, 'high': low + CHUNK})
+            low += CHUNK
+
+    # Category rollups were backfilled from the categories typed into
+    # donated_items; rebuild them from the resolved lines, as rebuild_rollups() does
+    day = "to_char(date, 'YYYY-MM-DD')" if op.get_bind().dialect.name == 'postgresql' else "strftime('%Y-%m-%d', date)"
+    insert = 'INSERT INTO donation_rollups (grain, period, key, count, amount, quantity) '
+    op.execute("DELETE FROM donation_rollups WHERE key >= 'category:' AND key < 'category;'")
+    op.execute(insert + f"SELECT 'day', {day}, 'category:' || category, count(*), 0, sum(quantity) "
+                        f"FROM donation_items GROUP BY {day}, category")
+    op.execute(insert + "SELECT 'month', substr(period, 1, 7), key, sum(count), sum(amount), sum(quantity) "
+                        "FROM donation_rollups WHERE grain = 'day' AND key >= 'category:' AND key < 'category;' "
+                        "GROUP BY substr(period, 1, 7), key")
+
+
+def downgrade():
+    with op.batch_alter_table('donation_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_items_item_name_date')
+        batch_op.drop_index('ix_donation_items_inventory_id')
+        batch_op.drop_index('ix_donation_items_donation_id')
+        batch_op.drop_index('ix_donation_items_date')
+
+    op.drop_table('donation_items')
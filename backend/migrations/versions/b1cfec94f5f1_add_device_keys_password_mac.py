@@ -0,0 +1,28 @@
+"""Add device_keys.password_mac
+
+Revision ID: b1cfec94f5f1
+Revises: f0c7c4c7dd3f
+Create Date: 2026-10-18 16:52:27.652358
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1cfec94f5f1'
+down_revision = 'f0c7c4c7dd3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keys issued without a password MAC cannot be checked; clients log in in full once
+    op.execute('DELETE FROM device_keys')
+    with op.batch_alter_table('device_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('password_mac', sa.String(length=64), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('device_keys', schema=None) as batch_op:
+        batch_op.drop_column('password_mac')
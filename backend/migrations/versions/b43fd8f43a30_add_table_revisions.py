@@ -0,0 +1,28 @@
+"""Add table_revisions
+
+Revision ID: b43fd8f43a30
+Revises: e93b6c15f2a7
+Create Date: 2026-10-18 15:39:26.304283
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b43fd8f43a30'
+down_revision = 'e93b6c15f2a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_revisions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('table_revisions')
@@ -0,0 +1,46 @@
+"""Make inventory (item_name, category) unique
+
+Revision ID: c5d27f81a6e4
+Revises: 8e41a7c2d9b3
+Create Date: 2026-10-18 13:05:37.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d27f81a6e4'
+down_revision = '8e41a7c2d9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fold any duplicate rows into the oldest one before enforcing uniqueness
+    op.execute("""
+        UPDATE inventory SET quantity = (
+            SELECT SUM(COALESCE(dup.quantity, 0)) FROM inventory dup
+            WHERE dup.item_name = inventory.item_name AND dup.category = inventory.category
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM inventory GROUP BY item_name, category HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM inventory WHERE id NOT IN (
+            SELECT keep.id FROM (SELECT MIN(id) AS id FROM inventory GROUP BY item_name, category) keep
+        )
+    """)
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_item_name_category')
+        batch_op.create_index('ix_inventory_item_name_category', ['item_name', 'category'], unique=True,
+                              postgresql_include=['quantity'])
+
+
+def downgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_item_name_category')
+        batch_op.create_index('ix_inventory_item_name_category', ['item_name', 'category'], unique=False,
+                              postgresql_include=['quantity'])
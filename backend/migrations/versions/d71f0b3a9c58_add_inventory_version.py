@@ -0,0 +1,26 @@
+"""Add inventory version column
+
+Revision ID: d71f0b3a9c58
+Revises: c5d27f81a6e4
+Create Date: 2026-10-18 14:21:09.664015
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd71f0b3a9c58'
+down_revision = 'c5d27f81a6e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,30 @@
+"""Add inventory critical_level
+
+Revision ID: e93b6c15f2a7
+Revises: d71f0b3a9c58
+Create Date: 2026-10-18 15:02:44.190327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b6c15f2a7'
+down_revision = 'd71f0b3a9c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('critical_level', sa.Integer(), server_default='10', nullable=False))
+
+    op.create_index('ix_inventory_stock_margin', 'inventory', [sa.text('quantity - critical_level')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_inventory_stock_margin', table_name='inventory')
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_column('critical_level')
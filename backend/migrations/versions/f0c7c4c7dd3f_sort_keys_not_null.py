@@ -0,0 +1,43 @@
+"""Make list sort keys NOT NULL
+
+Revision ID: f0c7c4c7dd3f
+Revises: 022096c793a6
+Create Date: 2026-10-18 16:50:25.972444
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f0c7c4c7dd3f'
+down_revision = '022096c793a6'
+branch_labels = None
+depends_on = None
+
+# (table, column): keyset cursors cannot step over NULLs in these
+SORT_KEYS = (
+    ('donations', 'date'),
+    ('inventory_logs', 'timestamp'),
+    ('orphans', 'admission_date'),
+    ('volunteers', 'join_date'),
+)
+
+
+def upgrade():
+    # Rows written without the model defaults get the migration time. Donations
+    # without a date were left out of donation_items and the rollups; run
+    # `flask analytics rebuild` if any were backfilled.
+    now = datetime.utcnow()
+    for table, column in SORT_KEYS:
+        op.execute(sa.text(f'UPDATE {table} SET {column} = :now WHERE {column} IS NULL').bindparams(now=now))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table, column in reversed(SORT_KEYS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,53 @@
+"""Add search_index
+
+Revision ID: f2a8d41c7e05
+Revises: b43fd8f43a30
+Create Date: 2026-10-18 16:05:12.418930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8d41c7e05'
+down_revision = 'b43fd8f43a30'
+branch_labels = None
+depends_on = None
+
+# Document id = source row id * 8 + slot, same as app/utils/search.py
+SOURCES = [
+    ('orphans', 'name', ('background', 'health_status')),
+    ('volunteers', 'name', ('email', 'address')),
+    ('donations', 'donor_name', ('notes',)),
+    ('events', 'name', ('description', 'location')),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE search_index USING fts5("
+                   "title, body, tokenize = 'unicode61 remove_diacritics 2')")
+        op.execute("INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        id_column = 'rowid'
+    elif dialect == 'postgresql':
+        op.execute("CREATE TABLE search_index ("
+                   "doc_id BIGINT PRIMARY KEY, title TEXT NOT NULL, body TEXT NOT NULL, "
+                   "document TSVECTOR GENERATED ALWAYS AS ("
+                   "setweight(to_tsvector('simple', title), 'A') || "
+                   "setweight(to_tsvector('simple', body), 'B')) STORED)")
+        op.execute("CREATE INDEX ix_search_index_document ON search_index USING gin (document)")
+        id_column = 'doc_id'
+    else:
+        return
+
+    for slot, (table, title, body) in enumerate(SOURCES):
+        joined = " || ' ' || ".join(f"coalesce({name}, '')" for name in body)
+        op.execute(f"INSERT INTO search_index ({id_column}, title, body) "
+                   f"SELECT id * 8 + {slot}, coalesce({title}, ''), trim({joined}) FROM {table}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        op.execute('DROP TABLE search_index')
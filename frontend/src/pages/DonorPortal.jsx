@@ -7,6 +7,7 @@ const DonorPortal = () => {
   const [activeTab, setActiveTab] = useState('dashboard');
   const [dashboardStats, setDashboardStats] = useState(null);
   const [donations, setDonations] = useState([]);
+  const [donationsCursor, setDonationsCursor] = useState(null);
   const [inventory, setInventory] = useState([]);
   const [criticalItems, setCriticalItems] = useState([]);
   const [profile, setProfile] = useState(null);
@@ -28,8 +29,7 @@ const DonorPortal = () => {
     password: ''
   });
   
-  // Pagination and filters
-  const [currentPage, setCurrentPage] = useState(1);
+  // Filters
   const [selectedCategory, setSelectedCategory] = useState('');
   const [selectedDonationId, setSelectedDonationId] = useState(null);
   const [selectedDonation, setSelectedDonation] = useState(null);
@@ -73,13 +73,14 @@ const apiCall = async (endpoint, options = {}) => {
     }
   };
 
-  // Load donations
-  const loadDonations = async (page = 1) => {
+  // Load donations, 10 at a time; pass the cursor to append the next page
+  const loadDonations = async (after = null) => {
     setLoading(true);
     try {
-      const data = await apiCall(`/api/donors/donations?page=${page}&per_page=10`);
-      setDonations(data.donations);
-      setCurrentPage(data.current_page);
+      const query = after ? `&after=${encodeURIComponent(after)}` : '';
+      const data = await apiCall(`/api/donors/donations?limit=10${query}`);
+      setDonations(previous => after ? [...previous, ...data.donations] : data.donations);
+      setDonationsCursor(data.next_cursor);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -564,6 +565,16 @@ const logout = async () => {
               </div>
             ))}
           </div>
+
+          {donationsCursor && (
+            <button
+              onClick={() => loadDonations(donationsCursor)}
+              disabled={loading}
+              className="mt-4 w-full px-4 py-2 border border-blue-500 text-blue-600 rounded-lg hover:bg-blue-50 disabled:opacity-50"
+            >
+              {loading ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       </div>
       
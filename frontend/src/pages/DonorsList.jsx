@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Search, Plus, X } from 'lucide-react';
+import { fetchAllPages } from '../utils/pagination';
 
 export default function Donations() {
   const [donations, setDonations] = useState([]);
@@ -28,11 +29,7 @@ export default function Donations() {
   const fetchDonations = async () => {
     try {
       setLoading(true);
-      const response = await fetch('http://127.0.0.1:5000/api/donations/');
-      if (!response.ok) {
-        throw new Error('Failed to fetch donations');
-      }
-      const data = await response.json();
+      const data = await fetchAllPages('http://127.0.0.1:5000/api/donations/');
       setDonations(data);
       setError(null);
     } catch (err) {
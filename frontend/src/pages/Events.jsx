@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Calendar, Clock, MapPin, Users, Plus, Edit2, Trash2, X, Check, ChevronDown, ChevronUp, AlertTriangle, Search, RefreshCw } from 'lucide-react';
+import { fetchAllPages } from '../utils/pagination';
 
 const API_BASE_URL = 'http://127.0.0.1:5000/api';
 
@@ -28,11 +29,7 @@ const Events = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await fetch(`${API_BASE_URL}/events/`);
-      if (!response.ok) {
-        throw new Error(`Failed to fetch events: ${response.status} ${response.statusText}`);
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`${API_BASE_URL}/events/?fields=all`);
       setEvents(data);
     } catch (err) {
       setError('Error fetching events. Please try again later.');
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Search, Plus, AlertTriangle, X, RefreshCw, Archive, Clock } from 'lucide-react';
+import { fetchAllPages } from '../utils/pagination';
 
 const API_BASE_URL = "http://127.0.0.1:5000/api";
 
@@ -35,11 +36,7 @@ const InventoryManagement = () => {
     setLoading(true);
     try {
       // In a real app with proper API integration:
-      const response = await fetch(`${API_BASE_URL}/inventory/`);
-      if (!response.ok) {
-        throw new Error(`HTTP error! Status: ${response.status}`);
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`${API_BASE_URL}/inventory/`);
       setInventory(data);
     } catch (error) {
       console.error('Error fetching inventory:', error);
@@ -62,11 +59,7 @@ const InventoryManagement = () => {
   const fetchLogs = async () => {
     try {
       // In a real app with proper API integration:
-      const response = await fetch(`${API_BASE_URL}/inventory/logs`);
-      if (!response.ok) {
-        throw new Error(`HTTP error! Status: ${response.status}`);
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`${API_BASE_URL}/inventory/logs`);
       setLogs(data);
     } catch (error) {
       console.error('Error fetching logs:', error);
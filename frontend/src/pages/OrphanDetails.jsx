@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Search, Plus, Edit, Trash2, X, Eye, Save, AlertCircle } from 'lucide-react';
+import { fetchAllPages } from '../utils/pagination';
 // import Sidebar from './SideBar';
 
 const OrphanManagement = () => {
@@ -31,13 +32,7 @@ const OrphanManagement = () => {
   const fetchOrphans = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_URL}/orphans/`);
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! Status: ${response.status}`);
-      }
-      
-      const data = await response.json();
+      const data = await fetchAllPages(`${API_URL}/orphans/?fields=all`);
       setOrphans(data);
       setError(null);
     } catch (err) {
@@ -0,0 +1,25 @@
+// List endpoints return one page at a time (a JSON array) and advertise the
+// next one in the X-Next-Cursor header. Screens that show the whole list
+// follow it to the last page.
+const PAGE_SIZE = 500;
+
+const pageUrl = (url, after) => {
+  const next = new URL(url);
+  next.searchParams.set('limit', PAGE_SIZE);
+  if (after) next.searchParams.set('after', after);
+  return next.toString();
+};
+
+export const fetchAllPages = async (url, options = {}) => {
+  const rows = [];
+  let after = null;
+  do {
+    const response = await fetch(pageUrl(url, after), options);
+    if (!response.ok) {
+      throw new Error(`HTTP error! Status: ${response.status} ${response.statusText}`);
+    }
+    rows.push(...(await response.json()));
+    after = response.headers.get('X-Next-Cursor');
+  } while (after);
+  return rows;
+};